@@ -20,18 +20,32 @@ class APIAgent(BaseAgent):
     Agent for fetching market data from financial APIs.
     """
     
-    def __init__(self, market_data_client=None, agent_id: str = "api_agent", agent_name: str = "API Agent"):
+    def __init__(self, market_data_client=None, web_scraper=None, agent_id: str = "api_agent", agent_name: str = "API Agent"):
         """
         Initialize the API agent.
         
         Args:
             market_data_client: Optional market data client
+            web_scraper: Optional shared web scraper (reuses its pooled HTTP session)
             agent_id: Unique identifier for the agent
             agent_name: Human-readable name for the agent
         """
         super().__init__(agent_id, agent_name)
         self.market_data_client = market_data_client
         self.market_data_api = MarketDataAPI()
+        self.web_scraper = web_scraper
+    
+    def _get_web_scraper(self):
+        """
+        Get the web scraper, creating it once on first use.
+        
+        Returns:
+            WebScraper instance shared by all calls on this agent
+        """
+        if self.web_scraper is None:
+            from data_ingestion.web_scraper import WebScraper
+            self.web_scraper = WebScraper()
+        return self.web_scraper
     
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -194,9 +208,8 @@ class APIAgent(BaseAgent):
             
             # If we found specific symbols or need indices, get real-time data for them
             if symbols:
-                # Import the web scraper to get real-time data
-                from data_ingestion.web_scraper import WebScraper
-                web_scraper = WebScraper()
+                # Reuse the agent's web scraper so its keep-alive connections survive between queries
+                web_scraper = self._get_web_scraper()
                 
                 # Get real-time market data
                 real_time_data = web_scraper.get_realtime_market_data(symbols)
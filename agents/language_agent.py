@@ -2,14 +2,49 @@
 Language agent for generating natural language responses.
 """
 import os
+import json
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+import requests
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chat completions are used when OPENAI_API_KEY is set; otherwise answers are built from templates
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
+MAX_TOKENS = int(os.getenv("MAX_TOKENS", "512"))
+
+# Static instructions sent first and never interpolated, so the provider can cache this prompt prefix
+SYSTEM_PROMPT = (
+    "You are a financial assistant for a portfolio manager. Answer concisely using the "
+    "market data, retrieved documents and news supplied in the user's message. Quote figures "
+    "exactly as given, say when data is missing, and do not give personalised investment advice."
+)
+
+def build_messages(query: str, context: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Build chat messages with a static system prompt.
+    
+    Per-query context goes in the user message rather than the system prompt, so the
+    prompt prefix is identical on every request and stays in the provider's prompt cache.
+    
+    Args:
+        query: User query
+        context: Optional serialized context (retrieved documents, market and news data)
+        
+    Returns:
+        List of chat messages
+    """
+    user_content = f"Context:\n{context}\n\nQuestion: {query}" if context else query
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_content}
+    ]
+
 class LanguageAgent:
     """
     Agent for generating natural language responses from analysis results.
@@ -18,6 +53,89 @@ class LanguageAgent:
     def __init__(self):
         """Initialize the language agent."""
         self.logger = logging.getLogger(__name__)
+        # The env.example placeholder counts as unset
+        api_key = os.getenv("OPENAI_API_KEY", "")
+        self.api_key = api_key if api_key and not api_key.startswith("your_") else None
+        self.session = requests.Session()
+    
+    def generate_text(self, query: str, retrieval_results: Any = None, market_data: Any = None,
+                      scraping_data: Any = None) -> str:
+        """
+        Answer a query from the data the other agents gathered.
+        
+        Args:
+            query: User query
+            retrieval_results: Documents from the retriever agent
+            market_data: Market data from the API agent
+            scraping_data: News and other scraped data
+            
+        Returns:
+            Natural language response
+        """
+        if self.api_key:
+            context = {
+                "market_data": market_data,
+                "documents": retrieval_results,
+                "news": scraping_data
+            }
+            serialized = json.dumps({key: value for key, value in context.items() if value}, default=str)
+            try:
+                return self._complete(build_messages(query, serialized if serialized != "{}" else None))
+            except (requests.RequestException, KeyError, IndexError, ValueError) as e:
+                self.logger.warning(f"Chat completion failed, answering from templates: {e}")
+        
+        return self._summarize_market_data(market_data)
+    
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Run a chat completion.
+        
+        Args:
+            messages: Chat messages from build_messages
+            
+        Returns:
+            The model's reply
+        """
+        response = self.session.post(
+            OPENAI_CHAT_URL,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": OPENAI_MODEL,
+                "messages": messages,
+                "temperature": TEMPERATURE,
+                "max_tokens": MAX_TOKENS
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+    
+    def _summarize_market_data(self, market_data: Any) -> str:
+        """
+        Describe the quotes in the API agent's market data.
+        
+        Args:
+            market_data: Market data from the API agent
+            
+        Returns:
+            Natural language summary
+        """
+        quotes = market_data.get("market_data") if isinstance(market_data, dict) else None
+        response_parts = []
+        for symbol, quote in (quotes or {}).items():
+            price = quote.get("price")
+            if price is None:
+                continue
+            part = f"{quote.get('name') or symbol} ({symbol}) is trading at ${price:,.2f}"
+            change_pct = quote.get("change_percent")
+            if change_pct is not None:
+                direction = "up" if change_pct > 0 else "down"
+                part += f", {direction} {abs(change_pct):.2f}% today"
+            response_parts.append(part + ".")
+        
+        if not response_parts:
+            return "I couldn't find live market data for that question right now. Please try again shortly."
+        return " ".join(response_parts)
     
     def generate_portfolio_response(self, analysis: Dict[str, Any], query: str) -> str:
         """
@@ -5,12 +5,17 @@ import os
 import logging
 from typing import Dict, List, Any, Optional
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Retrieval results are memoized per normalized query (LRU)
+RETRIEVAL_CACHE_MAX_SIZE = 1024
+
 class RetrieverAgent:
     """
     Agent for retrieving relevant documents from a vector store.
@@ -25,6 +30,8 @@ class RetrieverAgent:
         """
         self.vector_store = vector_store
         self.logger = logging.getLogger(__name__)
+        self._retrieval_cache = OrderedDict()
+        self._retrieval_cache_lock = threading.Lock()
     
     def retrieve_documents(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """
@@ -39,88 +46,114 @@ class RetrieverAgent:
         """
         self.logger.info(f"Retrieving documents for query: {query}")
         
+        # Repeated queries (ignoring case and spacing) are answered from the cache
+        normalized_query = " ".join(query.lower().split())
+        cache_key = (normalized_query, top_k)
+        with self._retrieval_cache_lock:
+            documents = self._retrieval_cache.get(cache_key)
+            if documents is not None:
+                self._retrieval_cache.move_to_end(cache_key)
+                return [dict(document) for document in documents]
+        
         try:
-            # In a real implementation, this would use the vector store
-            # For this demo, we'll return simulated results
-            
-            # Simulate document retrieval based on query keywords
-            documents = []
-            
-            if "asia" in query.lower() and "tech" in query.lower():
-                documents.append({
-                    "id": "doc1",
-                    "title": "Asian Tech Market Overview",
-                    "content": "Asian technology stocks have shown strong performance in recent quarters, driven by semiconductor demand and digital transformation trends.",
-                    "source": "Market Research Report",
-                    "date": "2023-04-15"
-                })
-                documents.append({
-                    "id": "doc2",
-                    "title": "Taiwan Semiconductor Earnings",
-                    "content": "Taiwan Semiconductor Manufacturing Company (TSMC) reported better-than-expected earnings, with a 4.2% surprise to the upside.",
-                    "source": "Earnings Report",
-                    "date": "2023-04-20"
-                })
-                documents.append({
-                    "id": "doc3",
-                    "title": "Tech Sector Allocation Strategy",
-                    "content": "Recommended portfolio allocation for Asian tech is 20-25% of AUM, with focus on semiconductor, hardware, and software segments.",
-                    "source": "Investment Strategy",
-                    "date": "2023-03-10"
-                })
-            
-            elif "earnings" in query.lower() or "surprises" in query.lower():
-                documents.append({
-                    "id": "doc4",
-                    "title": "Q1 Earnings Season Overview",
-                    "content": "Technology sector shows strong earnings performance with 65% of companies beating expectations. Average earnings surprise is 5.2%.",
-                    "source": "Earnings Report",
-                    "date": "2023-04-30"
-                })
-                documents.append({
-                    "id": "doc5",
-                    "title": "Samsung Earnings Miss",
-                    "content": "Samsung Electronics reported earnings below analyst expectations, missing EPS estimates by 2.1% due to weakness in memory chip prices.",
-                    "source": "Earnings Report",
-                    "date": "2023-04-27"
-                })
-                documents.append({
-                    "id": "doc6",
-                    "title": "Tech Earnings Calendar",
-                    "content": "Upcoming earnings reports for major technology companies including Apple, Microsoft, and Google parent Alphabet.",
-                    "source": "Earnings Calendar",
-                    "date": "2023-04-15"
-                })
-            
-            elif "market" in query.lower() or "overview" in query.lower():
-                documents.append({
-                    "id": "doc7",
-                    "title": "Global Market Daily Summary",
-                    "content": "Markets showing positive momentum with technology and consumer discretionary sectors leading gains. S&P 500 up 0.8%, NASDAQ up 1.2%.",
-                    "source": "Market Summary",
-                    "date": "2023-05-01"
-                })
-                documents.append({
-                    "id": "doc8",
-                    "title": "Sector Performance Analysis",
-                    "content": "Technology sector is the best performer today, up 1.8%. Energy is the worst performer, down 0.6%.",
-                    "source": "Sector Analysis",
-                    "date": "2023-05-01"
-                })
-                documents.append({
-                    "id": "doc9",
-                    "title": "Market Sentiment Indicators",
-                    "content": "Technical indicators suggest cautiously bullish sentiment with improving breadth and momentum.",
-                    "source": "Technical Analysis",
-                    "date": "2023-04-30"
-                })
-            
-            # Return the top k documents
-            return documents[:top_k]
-            
+            documents = self._match_documents(normalized_query)[:top_k]
         except Exception as e:
             self.logger.error(f"Error retrieving documents: {e}")
             return []
+        
+        with self._retrieval_cache_lock:
+            self._retrieval_cache[cache_key] = documents
+            if len(self._retrieval_cache) > RETRIEVAL_CACHE_MAX_SIZE:
+                self._retrieval_cache.popitem(last=False)
+        
+        # Callers get their own copies, so editing a result cannot corrupt the cached documents
+        return [dict(document) for document in documents]
+    
+    def _match_documents(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Match documents against a normalized (lowercased) query.
+        
+        Args:
+            query: Lowercased query string
+            
+        Returns:
+            List of matching documents, most relevant first
+        """
+        # In a real implementation, this would use the vector store
+        # For this demo, we'll return simulated results
+        # Simulate document retrieval based on query keywords
+        documents = []
+        
+        if "asia" in query and "tech" in query:
+            documents.append({
+                "id": "doc1",
+                "title": "Asian Tech Market Overview",
+                "content": "Asian technology stocks have shown strong performance in recent quarters, driven by semiconductor demand and digital transformation trends.",
+                "source": "Market Research Report",
+                "date": "2023-04-15"
+            })
+            documents.append({
+                "id": "doc2",
+                "title": "Taiwan Semiconductor Earnings",
+                "content": "Taiwan Semiconductor Manufacturing Company (TSMC) reported better-than-expected earnings, with a 4.2% surprise to the upside.",
+                "source": "Earnings Report",
+                "date": "2023-04-20"
+            })
+            documents.append({
+                "id": "doc3",
+                "title": "Tech Sector Allocation Strategy",
+                "content": "Recommended portfolio allocation for Asian tech is 20-25% of AUM, with focus on semiconductor, hardware, and software segments.",
+                "source": "Investment Strategy",
+                "date": "2023-03-10"
+            })
+        
+        elif "earnings" in query or "surprises" in query:
+            documents.append({
+                "id": "doc4",
+                "title": "Q1 Earnings Season Overview",
+                "content": "Technology sector shows strong earnings performance with 65% of companies beating expectations. Average earnings surprise is 5.2%.",
+                "source": "Earnings Report",
+                "date": "2023-04-30"
+            })
+            documents.append({
+                "id": "doc5",
+                "title": "Samsung Earnings Miss",
+                "content": "Samsung Electronics reported earnings below analyst expectations, missing EPS estimates by 2.1% due to weakness in memory chip prices.",
+                "source": "Earnings Report",
+                "date": "2023-04-27"
+            })
+            documents.append({
+                "id": "doc6",
+                "title": "Tech Earnings Calendar",
+                "content": "Upcoming earnings reports for major technology companies including Apple, Microsoft, and Google parent Alphabet.",
+                "source": "Earnings Calendar",
+                "date": "2023-04-15"
+            })
+        
+        elif "market" in query or "overview" in query:
+            documents.append({
+                "id": "doc7",
+                "title": "Global Market Daily Summary",
+                "content": "Markets showing positive momentum with technology and consumer discretionary sectors leading gains. S&P 500 up 0.8%, NASDAQ up 1.2%.",
+                "source": "Market Summary",
+                "date": "2023-05-01"
+            })
+            documents.append({
+                "id": "doc8",
+                "title": "Sector Performance Analysis",
+                "content": "Technology sector is the best performer today, up 1.8%. Energy is the worst performer, down 0.6%.",
+                "source": "Sector Analysis",
+                "date": "2023-05-01"
+            })
+            documents.append({
+                "id": "doc9",
+                "title": "Market Sentiment Indicators",
+                "content": "Technical indicators suggest cautiously bullish sentiment with improving breadth and momentum.",
+                "source": "Technical Analysis",
+                "date": "2023-04-30"
+            })
+        
+        return documents
     
     def search(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
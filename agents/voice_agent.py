@@ -4,6 +4,10 @@ Handles speech-to-text and text-to-speech functionality with improved accuracy.
 """
 import logging
 import os
+import re
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 import gtts
@@ -14,6 +18,40 @@ import speech_recognition as sr
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Long replies are synthesized as sentence groups in parallel and joined in order
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+TTS_SEGMENT_CHARS = 300
+TTS_MAX_WORKERS = 4
+
+# Synthesized replies are written here so API responses can point clients at a file
+AUDIO_OUTPUT_DIR = os.getenv("AUDIO_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "finance_assistant_audio"))
+
+# Speech recognizers work at 16 kHz mono; downmixing first shrinks the audio uploaded for recognition
+STT_SAMPLE_RATE = 16000
+
+def split_sentences(text, max_chars=TTS_SEGMENT_CHARS):
+    """
+    Split text into groups of whole sentences of at most max_chars characters.
+    
+    Args:
+        text (str): The text to split
+        max_chars (int): Target maximum length of each group
+        
+    Returns:
+        list: Non-empty text segments in their original order
+    """
+    segments = []
+    current = ""
+    for sentence in SENTENCE_END_RE.split(text.strip()):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
 class VoiceAgent:
     """
     A voice agent that handles speech-to-text and text-to-speech functionality.
@@ -30,13 +68,38 @@ class VoiceAgent:
         self.recognizer.dynamic_energy_ratio = 1.5
         self.recognizer.pause_threshold = 0.8
         self.recognizer.operation_timeout = 10  # seconds
+    
+    def warmup(self):
+        """
+        Run one second of silence through the audio decoding path.
+        
+        Loads the ffmpeg-backed decoder and recognizer audio pipeline ahead of the
+        first request. No recognition service is called.
+        """
+        try:
+            silence_io = BytesIO()
+            with wave.open(silence_io, "wb") as silence:
+                silence.setnchannels(1)
+                silence.setsampwidth(2)
+                silence.setframerate(16000)
+                silence.writeframes(b"\x00\x00" * 16000)
+            silence_io.seek(0)
+            audio = AudioSegment.from_file(silence_io, format="wav")
+            wav_io = BytesIO()
+            audio.export(wav_io, format="wav")
+            wav_io.seek(0)
+            with sr.AudioFile(wav_io) as source:
+                self.recognizer.record(source)
+            logger.info("Voice agent warmed up")
+        except Exception as e:
+            logger.warning(f"Voice agent warmup failed: {e}")
         
     def speech_to_text(self, audio_file):
         """
         Convert speech from an audio file to text.
         
         Args:
-            audio_file: The audio file to process (bytes or file path)
+            audio_file: The audio file to process (bytes, binary file-like object or file path)
             
         Returns:
             str: The transcribed text or None if an error occurred
@@ -44,15 +107,20 @@ class VoiceAgent:
         try:
             # Handle different input types
             if isinstance(audio_file, bytes):
-                # Convert bytes to an AudioData object
-                with BytesIO(audio_file) as audio_io:
-                    # Convert to wav format for better compatibility
-                    audio = AudioSegment.from_file(audio_io)
-                    wav_io = BytesIO()
-                    audio.export(wav_io, format="wav")
-                    wav_io.seek(0)
-                    with sr.AudioFile(wav_io) as source:
-                        audio_data = self.recognizer.record(source)
+                audio_file = BytesIO(audio_file)
+            
+            if hasattr(audio_file, "read"):
+                # Decode file-like input (including uploads) directly, without copying it to bytes first;
+                # uploads can be read again on a later rerun, so start from the beginning
+                if audio_file.seekable():
+                    audio_file.seek(0)
+                # Convert to 16 kHz mono wav for compatibility and a smaller recognition upload
+                audio = AudioSegment.from_file(audio_file).set_channels(1).set_frame_rate(STT_SAMPLE_RATE)
+                wav_io = BytesIO()
+                audio.export(wav_io, format="wav")
+                wav_io.seek(0)
+                with sr.AudioFile(wav_io) as source:
+                    audio_data = self.recognizer.record(source)
             elif isinstance(audio_file, str) and os.path.exists(audio_file):
                 # Load from file path
                 with sr.AudioFile(audio_file) as source:
@@ -97,14 +165,79 @@ class VoiceAgent:
             bytes: The audio bytes or None if an error occurred
         """
         try:
-            tts = gtts.gTTS(text=text, lang=lang, slow=slow)
-            audio_bytes_io = BytesIO()
-            tts.write_to_fp(audio_bytes_io)
-            audio_bytes_io.seek(0)
-            return audio_bytes_io.read()
+            segments = split_sentences(text)
+            if len(segments) <= 1:
+                return self._synthesize(text, lang, slow)
+            
+            # MP3 frames concatenate cleanly, so segments can be synthesized concurrently
+            with ThreadPoolExecutor(max_workers=min(TTS_MAX_WORKERS, len(segments))) as executor:
+                audio_segments = list(executor.map(lambda segment: self._synthesize(segment, lang, slow), segments))
+            return b"".join(audio_segments)
         except Exception as e:
             logger.error(f"Error in text-to-speech conversion: {e}")
             return None
+    
+    def text_to_speech_file(self, text, lang="en", slow=False):
+        """
+        Convert text to speech and save it as an MP3 file.
+        
+        Args:
+            text (str): The text to convert to speech
+            lang (str): The language code (default: "en")
+            slow (bool): Whether to speak slowly (default: False)
+            
+        Returns:
+            str: Path of the MP3 file or None if an error occurred
+        """
+        audio_bytes = self.text_to_speech(text, lang, slow)
+        if not audio_bytes:
+            return None
+        
+        try:
+            os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=AUDIO_OUTPUT_DIR, suffix=".mp3", delete=False) as audio_file:
+                audio_file.write(audio_bytes)
+            return audio_file.name
+        except OSError as e:
+            logger.error(f"Error saving synthesized speech: {e}")
+            return None
+    
+    def iter_speech(self, text, lang="en", slow=False):
+        """
+        Convert text to speech, yielding MP3 audio as each part arrives.
+        
+        gTTS fetches long text in short parts; yielding each one as it is received lets
+        playback start after the first request instead of the last.
+        
+        Args:
+            text (str): The text to convert to speech
+            lang (str): The language code (default: "en")
+            slow (bool): Whether to speak slowly (default: False)
+            
+        Yields:
+            bytes: MP3 audio bytes for the next part
+        """
+        try:
+            yield from gtts.gTTS(text=text, lang=lang, slow=slow).stream()
+        except Exception as e:
+            logger.error(f"Error in streaming text-to-speech conversion: {e}")
+    
+    def _synthesize(self, text, lang, slow):
+        """
+        Synthesize a single piece of text with gTTS.
+        
+        Args:
+            text (str): The text to convert to speech
+            lang (str): The language code
+            slow (bool): Whether to speak slowly
+            
+        Returns:
+            bytes: The MP3 audio bytes
+        """
+        tts = gtts.gTTS(text=text, lang=lang, slow=slow)
+        audio_bytes_io = BytesIO()
+        tts.write_to_fp(audio_bytes_io)
+        return audio_bytes_io.getvalue()
 
 # Example usage
 if __name__ == "__main__":
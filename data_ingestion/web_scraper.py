@@ -4,9 +4,12 @@ Module for scraping financial news and filings from various sources.
 import os
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Any, Optional
 import pandas as pd
-from bs4 import BeautifulSoup
+import numpy as np
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve as sv
 from datetime import datetime, timedelta
 import time
 import random
@@ -14,40 +17,215 @@ import json
 import re
 import threading
 import functools
+import html
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Only build the <body> subtree of filing pages; <head> holds scripts, styles and metadata
+FILING_STRAINER = SoupStrainer("body")
+
+# Characters of markup read before <body> is found; also bounds documents that never open a <body>
+FILING_HEAD_ALLOWANCE = 1000000
+
+# Whitespace cleanup for extracted filing text
+WHITESPACE_RE = re.compile(r'[ \t]+')
+LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+
+# Tag stripping for filings that are plain text wrapped in markup
+TAG_RE = re.compile(r'<[^>]+>')
+SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# Numeric values in scraped text, e.g. "1,234.56", "-0.42" or "(+1.2%)"
+NUMBER_RE = re.compile(r'-?\d[\d,]*\.?\d*')
+NUMBER_SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+# Quote page selectors, compiled once at import instead of on every select call
+MW_PRICE_SELECTOR = sv.compile(".intraday__price .value")
+MW_CHANGE_SELECTOR = sv.compile(".change--point--q .change--point--q")
+MW_CHANGE_PCT_SELECTOR = sv.compile(".change--percent--q")
+MW_QUOTE_FIELD_SELECTORS = {
+    "price": MW_PRICE_SELECTOR,
+    "change": MW_CHANGE_SELECTOR,
+    "change_percent": MW_CHANGE_PCT_SELECTOR
+}
+MW_QUOTE_FIELDS_SELECTOR = sv.compile(", ".join(sel.pattern for sel in MW_QUOTE_FIELD_SELECTORS.values()))
+MW_KEY_DATA_ITEM_SELECTOR = sv.compile(".kv__item")
+MW_KEY_DATA_VALUE_SELECTOR = sv.compile(".primary")
+
+INVESTING_PRICE_SELECTOR = sv.compile(".instrument-price_last__KQzyA")
+INVESTING_CHANGE_SELECTOR = sv.compile(".instrument-price_change-value__jkuml")
+INVESTING_CHANGE_PCT_SELECTOR = sv.compile(".instrument-price_change-percent__l93qX")
+INVESTING_QUOTE_FIELD_SELECTORS = {
+    "price": INVESTING_PRICE_SELECTOR,
+    "change": INVESTING_CHANGE_SELECTOR,
+    "change_percent": INVESTING_CHANGE_PCT_SELECTOR
+}
+INVESTING_QUOTE_FIELDS_SELECTOR = sv.compile(", ".join(sel.pattern for sel in INVESTING_QUOTE_FIELD_SELECTORS.values()))
+INVESTING_KEY_INFO_ROW_SELECTOR = sv.compile("div.key-info_row__QKb3Z")
+INVESTING_KEY_INFO_VALUE_SELECTOR = sv.compile(".key-info_value__RWVnj")
+
+GOOGLE_PRICE_SELECTOR = sv.compile("div[data-last-price]")
+GOOGLE_INFO_ROW_SELECTOR = sv.compile("div.gyFHrc")
+GOOGLE_INFO_LABEL_SELECTOR = sv.compile("div.mfs7Fc")
+GOOGLE_INFO_VALUE_SELECTOR = sv.compile("div.P6K39c")
+
+# Major indices reported when no symbols are requested
+DEFAULT_INDICES = [
+    "^DJI",    # Dow Jones
+    "^GSPC",   # S&P 500
+    "^IXIC",   # NASDAQ
+    "^N225",   # Nikkei 225
+    "^HSI",    # Hang Seng
+    "^FTSE",   # FTSE 100
+    "^GDAXI",  # DAX
+    "^FCHI"    # CAC 40
+]
+
+# Quote sources in merge priority order, with the fields each one provides
+QUOTE_SOURCE_PRIORITY = [
+    ("yahoo_finance", "Yahoo Finance", ("price", "change", "change_percent", "volume", "market_cap", "pe_ratio", "52w_high", "52w_low")),
+    ("google_finance", "Google Finance", ("price", "change", "change_percent", "market_cap", "pe_ratio")),
+    ("marketwatch", "MarketWatch", ("price", "change", "change_percent", "volume")),
+    ("investing", "Investing.com", ("price", "change", "change_percent", "volume"))
+]
+
+# Yahoo Finance index symbols mapped to their Investing.com instrument names
+INVESTING_INDEX_SYMBOLS = {
+    "^DJI": "us-30",
+    "^GSPC": "us-spx-500",
+    "^IXIC": "nasdaq-composite",
+    "^N225": "japan-ni225",
+    "^HSI": "hang-sen-40",
+    "^FTSE": "uk-100",
+    "^GDAXI": "germany-30",
+    "^FCHI": "france-40"
+}
+
+# Yahoo Finance index symbols mapped to their Google Finance quote identifiers
+GOOGLE_INDEX_SYMBOLS = {
+    "^DJI": ".DJI:INDEXDJX",
+    "^GSPC": ".INX:INDEXSP",
+    "^IXIC": ".IXIC:INDEXNASDAQ",
+    "^N225": "NI225:INDEXNIKKEI",
+    "^HSI": "HSI:INDEXHANGSENG",
+    "^FTSE": "FTSE:INDEXFTSE"
+}
+
+# Display names for the symbols the scraper knows about
+COMPANY_NAMES = {
+    "AAPL": "Apple Inc.",
+    "MSFT": "Microsoft Corporation",
+    "GOOGL": "Alphabet Inc.",
+    "AMZN": "Amazon.com Inc.",
+    "META": "Meta Platforms Inc.",
+    "TSLA": "Tesla Inc.",
+    "NVDA": "NVIDIA Corporation",
+    "IBM": "International Business Machines",
+    "INTC": "Intel Corporation",
+    "AMD": "Advanced Micro Devices Inc.",
+    "TSM": "Taiwan Semiconductor Manufacturing",
+    "CSCO": "Cisco Systems Inc."
+}
+
+# Real company symbols used for the earnings calendar
+EARNINGS_SYMBOLS = list(COMPANY_NAMES)
+EARNINGS_TIMES = ("Before Market Open", "After Market Close")
+
+# Per-symbol quote TTLs: a long safety net while the market tick versions the entry,
+# the original plain TTL when no tick is available
+QUOTE_TICK_TTL_SECONDS = 900
+QUOTE_TTL_SECONDS = 300
+FALLBACK_QUOTE_SOURCE = "Fallback Data"
+
 # Add caching with TTL
 cache = {}
 cache_lock = threading.Lock()
 
-def cached(ttl_seconds=600):
-    """Cache decorator with time-to-live in seconds"""
+def _cache_lookup(key: str, ttl_seconds: int, version: Any = None) -> tuple:
+    """Return (True, result) if key holds a fresh entry at the given version, else (False, None)."""
+    with cache_lock:
+        if key in cache:
+            result, timestamp, cached_version = cache[key]
+            if datetime.now() - timestamp < timedelta(seconds=ttl_seconds) and cached_version == version:
+                return True, result
+    return False, None
+
+def _cache_store(key: str, result: Any, version: Any = None) -> None:
+    """Store a result in the cache under key."""
+    with cache_lock:
+        cache[key] = (result, datetime.now(), version)
+
+# Parsed pages are large, so only a few recent ones are kept, briefly, to dedupe repeated fetches
+PARSED_PAGE_CACHE_SIZE = 16
+PARSED_PAGE_TTL_SECONDS = 60
+parsed_page_cache = OrderedDict()
+parsed_page_lock = threading.Lock()
+
+def cached(ttl_seconds=600, version=None):
+    """
+    Cache decorator with time-to-live in seconds.
+    
+    If version is given, it is called with the wrapped function's arguments and
+    returns a cheap token describing the upstream data (e.g. the last market tick).
+    A cached result is dropped as soon as the token changes, so ttl_seconds only
+    acts as a safety net.
+    """
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             # Create a cache key from function name and arguments
             key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
+            current_version = version(*args, **kwargs) if version else None
             
-            with cache_lock:
-                # Check if result is in cache and not expired
-                if key in cache:
-                    result, timestamp = cache[key]
-                    if datetime.now() - timestamp < timedelta(seconds=ttl_seconds):
-                        return result
+            # Check if result is in cache, not expired and still current
+            hit, result = _cache_lookup(key, ttl_seconds, current_version)
+            if hit:
+                return result
             
             # Call the function and cache the result
             result = func(*args, **kwargs)
-            
-            with cache_lock:
-                cache[key] = (result, datetime.now())
+            _cache_store(key, result, current_version)
             
             return result
         return wrapper
     return decorator
 
+def _select_fields(soup: BeautifulSoup, combined_selector, field_selectors: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Find the first element for each of several fields in a single pass over the tree.
+    
+    Args:
+        soup: Parsed page
+        combined_selector: Compiled selector list matching every field
+        field_selectors: Compiled selector for each field name
+        
+    Returns:
+        Dictionary mapping field names to their first matching element
+    """
+    fields = {}
+    for elem in combined_selector.select(soup):
+        for field, selector in field_selectors.items():
+            if field not in fields and selector.match(elem):
+                fields[field] = elem
+    return fields
+
+def _to_float(text: Optional[str]) -> Optional[float]:
+    """Parse the first number in scraped text, ignoring commas, signs and %/() decoration."""
+    match = NUMBER_RE.search(text) if text else None
+    return float(match.group(0).replace(",", "")) if match else None
+
+def _to_suffix_float(text: Optional[str]) -> Optional[float]:
+    """Parse an abbreviated number such as "1.2M" or "345.67K"."""
+    match = NUMBER_RE.search(text) if text else None
+    if not match:
+        return None
+    multiplier = NUMBER_SUFFIXES.get(text[match.end():match.end() + 1].upper(), 1)
+    return float(match.group(0).replace(",", "")) * multiplier
+
 class WebScraper:
     """
     Class for scraping financial news and filings from various sources.
@@ -60,15 +238,25 @@ class WebScraper:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,application/json;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
             'Cache-Control': 'max-age=0'
         }
         
+        # Shared session so connections (and TLS handshakes) are reused across requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Negotiate compressed, keep-alive responses by default (br is decoded via the brotli package)
+        self.session.headers.update(self.headers)
+        
         # Define base URLs for different sources
         self.yahoo_finance_base = "https://finance.yahoo.com"
+        self.yahoo_finance_api_base = "https://query1.finance.yahoo.com"
         self.market_watch_base = "https://www.marketwatch.com"
         self.seeking_alpha_base = "https://seekingalpha.com"
         self.sec_edgar_base = "https://www.sec.gov/edgar"
@@ -242,9 +430,9 @@ class WebScraper:
             # Use random headers
             headers = self._get_random_headers()
             
-            response = requests.get(url, headers=headers, params=params, timeout=15)
+            response = self.session.get(url, headers=headers, params=params, timeout=15)
             response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
+            return BeautifulSoup(response.text, 'lxml')
         except requests.exceptions.RequestException as e:
             logger.error(f"Error requesting {url}: {e}")
             if retry_count > 0:
@@ -253,6 +441,34 @@ class WebScraper:
                 return self._make_request(url, params, retry_count - 1)
             return None
     
+    def _fetch_and_parse(self, url: str) -> Optional[BeautifulSoup]:
+        """
+        Fetch and parse a page, reusing the parsed tree for repeated requests of the same URL.
+        
+        Args:
+            url: URL to request
+            
+        Returns:
+            BeautifulSoup object or None if request failed
+        """
+        with parsed_page_lock:
+            entry = parsed_page_cache.get(url)
+            if entry is not None and time.monotonic() - entry[1] < PARSED_PAGE_TTL_SECONDS:
+                parsed_page_cache.move_to_end(url)
+                return entry[0]
+        
+        soup = self._make_request(url)
+        
+        # Failed requests are not cached, so the next call retries them
+        if soup is not None:
+            with parsed_page_lock:
+                parsed_page_cache[url] = (soup, time.monotonic())
+                parsed_page_cache.move_to_end(url)
+                while len(parsed_page_cache) > PARSED_PAGE_CACHE_SIZE:
+                    parsed_page_cache.popitem(last=False)
+        
+        return soup
+    
     def _make_api_request(self, url: str, params: Optional[Dict[str, Any]] = None, retry_count: int = 2) -> Optional[Dict[str, Any]]:
         """
         Make an HTTP request to an API and return JSON result.
@@ -271,7 +487,7 @@ class WebScraper:
             # Use random headers
             headers = self._get_random_headers()
             
-            response = requests.get(url, headers=headers, params=params, timeout=15)
+            response = self.session.get(url, headers=headers, params=params, timeout=15)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -741,23 +957,16 @@ class WebScraper:
             
             # Randomly select 2-5 companies for each day
             num_companies = random.randint(2, 5)
-            companies = []
             
-            # Use some real company symbols
-            symbols = ["AAPL", "MSFT", "GOOGL", "AMZN", "META", "TSLA", "NVDA", "IBM", "INTC", "AMD", "TSM", "CSCO"]
-            random.shuffle(symbols)
-            
-            for j in range(min(num_companies, len(symbols))):
-                symbol = symbols[j]
-                
-                # Randomly determine before/after market
-                time_str = random.choice(["Before Market Open", "After Market Close"])
-                
-                companies.append({
+            # Randomly determine before/after market for each company
+            companies = [
+                {
                     "symbol": symbol,
                     "name": self._get_company_name(symbol),
-                    "time": time_str
-                })
+                    "time": random.choice(EARNINGS_TIMES)
+                }
+                for symbol in random.sample(EARNINGS_SYMBOLS, k=min(num_companies, len(EARNINGS_SYMBOLS)))
+            ]
             
             calendar.append({
                 "date": date_str,
@@ -766,23 +975,11 @@ class WebScraper:
         
         return calendar
     
-    def _get_company_name(self, symbol: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def _get_company_name(symbol: str) -> str:
         """Get company name for a symbol."""
-        company_names = {
-            "AAPL": "Apple Inc.",
-            "MSFT": "Microsoft Corporation",
-            "GOOGL": "Alphabet Inc.",
-            "AMZN": "Amazon.com Inc.",
-            "META": "Meta Platforms Inc.",
-            "TSLA": "Tesla Inc.",
-            "NVDA": "NVIDIA Corporation",
-            "IBM": "International Business Machines",
-            "INTC": "Intel Corporation",
-            "AMD": "Advanced Micro Devices Inc.",
-            "TSM": "Taiwan Semiconductor Manufacturing",
-            "CSCO": "Cisco Systems Inc."
-        }
-        return company_names.get(symbol, f"{symbol} Inc.")
+        return COMPANY_NAMES.get(symbol, f"{symbol} Inc.")
     
     def get_filing_content(self, filing_url: str) -> str:
         """
@@ -803,29 +1000,67 @@ class WebScraper:
             sec_headers = self.headers.copy()
             sec_headers['User-Agent'] = 'Finance Assistant research@example.com'
             
-            response = requests.get(filing_url, headers=sec_headers, timeout=15)
-            response.raise_for_status()
+            # Text files are returned as is (first 50K characters). For HTML files the result is
+            # capped at 50K characters of text, so only the first 200K characters of markup from
+            # <body> on are used; a long <head> of inline styles or XBRL does not count toward it.
+            is_text_file = filing_url.endswith('.txt')
+            limit = 50000 if is_text_file else 200000
             
-            # For text files, return as is
-            if filing_url.endswith('.txt'):
-                # Limit content to a reasonable size
-                content = response.text[:50000]  # Get first 50K characters
-                return content
+            # Stream the body and stop downloading once enough characters have arrived
+            with self.session.get(filing_url, headers=sec_headers, timeout=15, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '')
+                response.encoding = response.encoding or 'utf-8'
+                
+                # Offset where the limit starts counting; unknown until <body is seen for HTML
+                body_start = 0 if is_text_file or 'text/plain' in content_type else None
+                chunks = []
+                received = 0
+                tail = ''
+                for chunk in response.iter_content(chunk_size=65536, decode_unicode=True):
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if body_start is None:
+                        # Keep a few characters of the previous chunk so a tag split across chunks is found
+                        window = tail + chunk
+                        found = window.lower().find('<body')
+                        if found != -1:
+                            body_start = received - len(window) + found
+                        tail = window[-4:]
+                    if body_start is not None and received - body_start >= limit:
+                        break
+                    # Hard ceiling, so a document without <body> is not read whole
+                    if received >= limit + FILING_HEAD_ALLOWANCE:
+                        break
             
-            # For HTML files, parse and extract text
-            soup = BeautifulSoup(response.text, 'html.parser')
+            markup = ''.join(chunks)
+            if body_start is not None:
+                markup = markup[:body_start + limit]
+            else:
+                markup = markup[:limit + FILING_HEAD_ALLOWANCE]
             
-            # Remove scripts and styles
-            for script in soup(["script", "style"]):
-                script.extract()
+            # For text files, return as is
+            if is_text_file:
+                return markup
             
-            # Get text
-            text = soup.get_text(separator='\n', strip=True)
+            if 'text/plain' in content_type or '<pre' in markup[:4096].lower():
+                # Plain text wrapped in <pre>/<document> tags: stripping the tags is enough
+                text = SCRIPT_STYLE_RE.sub(' ', markup)
+                text = html.unescape(TAG_RE.sub(' ', text))
+            else:
+                # For HTML files, parse only the document body and extract text
+                soup = BeautifulSoup(markup, 'lxml', parse_only=FILING_STRAINER)
+                
+                # Remove scripts and styles embedded in the body
+                for script in soup(["script", "style"]):
+                    script.extract()
+                
+                # Get text
+                text = soup.get_text(separator='\n', strip=True)
             
             # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
+            text = WHITESPACE_RE.sub(' ', text)
+            text = LINE_BREAK_RE.sub('\n', text).strip()
             
             # Limit content to a reasonable size
             return text[:50000]  # Get first 50K characters
@@ -834,11 +1069,43 @@ class WebScraper:
             logger.error(f"Error fetching filing content: {e}")
             return f"Error retrieving filing content: {str(e)}"
     
-    @cached(ttl_seconds=300)  # Cache for 5 minutes (shorter time for market data)
+    @cached(ttl_seconds=60)  # Probe at most once a minute
+    def _get_market_ticks(self, symbols: List[str]) -> Dict[str, int]:
+        """
+        Get the latest market tick time for each of the given symbols.
+        
+        Used as the cache version of the per-symbol quotes, so a quote is only
+        re-scraped once its market has actually moved.
+        
+        Args:
+            symbols: List of stock symbols
+            
+        Returns:
+            Dictionary mapping symbols to regularMarketTime (empty if the probe failed)
+        """
+        try:
+            response = self.session.get(
+                f"{self.yahoo_finance_api_base}/v7/finance/quote",
+                params={"symbols": ",".join(symbols), "fields": "regularMarketTime"},
+                headers=self._get_random_headers(),
+                timeout=5
+            )
+            response.raise_for_status()
+            quotes = response.json().get("quoteResponse", {}).get("result") or []
+            return {quote["symbol"]: quote.get("regularMarketTime") for quote in quotes if quote.get("symbol")}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Market tick probe failed: {e}")
+            return {}
+    
     def get_realtime_market_data(self, symbols: List[str] = None) -> Dict[str, Any]:
         """
         Get real-time market data for specified symbols or major indices.
         
+        Quotes are cached per symbol under "quote:{symbol}", so callers asking for
+        overlapping symbol lists share entries. An entry is refreshed whenever the
+        symbol's market tick changes; the 15 minute TTL is only a safety net. Without
+        a tick the entry expires after 5 minutes, and fallback quotes are never cached.
+        
         Args:
             symbols: List of stock symbols to get data for
                     If None, returns data for major indices
@@ -848,57 +1115,71 @@ class WebScraper:
         """
         if symbols is None:
             # Default to major indices if no symbols provided
-            symbols = [
-                "^DJI",    # Dow Jones
-                "^GSPC",   # S&P 500
-                "^IXIC",   # NASDAQ
-                "^N225",   # Nikkei 225
-                "^HSI",    # Hang Seng
-                "^FTSE",   # FTSE 100
-                "^GDAXI",  # DAX
-                "^FCHI"    # CAC 40
-            ]
+            symbols = DEFAULT_INDICES
         
-        results = {}
+        ticks = self._get_market_ticks(symbols)
         
-        # Try Yahoo Finance first (most reliable for quotes)
-        try:
-            yahoo_data = self._get_yahoo_finance_quotes(symbols)
-            if yahoo_data:
-                results["yahoo_finance"] = yahoo_data
-                logger.info(f"Got market data for {len(yahoo_data)} symbols from Yahoo Finance")
-        except Exception as e:
-            logger.error(f"Error getting Yahoo Finance quotes: {e}")
+        unified_data = {}
+        missing_symbols = []
+        for symbol in symbols:
+            tick = ticks.get(symbol)
+            ttl_seconds = QUOTE_TICK_TTL_SECONDS if tick is not None else QUOTE_TTL_SECONDS
+            hit, symbol_data = _cache_lookup(f"quote:{symbol}", ttl_seconds, tick)
+            if hit:
+                unified_data[symbol] = symbol_data
+            else:
+                missing_symbols.append(symbol)
+        
+        # Scrape all uncached symbols in one batch and cache each quote separately
+        if missing_symbols:
+            for symbol, symbol_data in self._fetch_market_data(missing_symbols).items():
+                # Synthetic quotes are not cached, so the next request retries the real sources
+                if symbol_data["source"] != FALLBACK_QUOTE_SOURCE:
+                    _cache_store(f"quote:{symbol}", symbol_data, ticks.get(symbol))
+                unified_data[symbol] = symbol_data
+        
+        return {symbol: unified_data[symbol] for symbol in symbols if symbol in unified_data}
+    
+    def _fetch_market_data(self, symbols: List[str]) -> Dict[str, Any]:
+        """
+        Scrape market data for the given symbols from all quote sources.
+        
+        Args:
+            symbols: List of stock symbols to get data for
             
-        # Try Google Finance
-        try:
-            google_data = self._get_google_finance_quotes(symbols[:5])  # Limit to 5 symbols for Google Finance
-            if google_data:
-                results["google_finance"] = google_data
-                logger.info(f"Got market data for {len(google_data)} symbols from Google Finance")
-        except Exception as e:
-            logger.error(f"Error getting Google Finance quotes: {e}")
+        Returns:
+            Dictionary with market data, using fallback data if every source failed
+        """
+        results = {}
         
-        # Try MarketWatch for additional data
-        try:
-            mw_data = self._get_marketwatch_quotes(symbols[:3])  # Limit to 3 symbols for MarketWatch
-            if mw_data:
-                results["marketwatch"] = mw_data
-                logger.info(f"Got market data for {len(mw_data)} symbols from MarketWatch")
-        except Exception as e:
-            logger.error(f"Error getting MarketWatch quotes: {e}")
+        # Query all sources concurrently; each one is a different host and the work is I/O bound
+        source_requests = {
+            "yahoo_finance": ("Yahoo Finance", self._get_yahoo_finance_quotes, symbols),
+            "google_finance": ("Google Finance", self._get_google_finance_quotes, symbols[:5]),  # Limit to 5 symbols for Google Finance
+            "marketwatch": ("MarketWatch", self._get_marketwatch_quotes, symbols[:3]),  # Limit to 3 symbols for MarketWatch
+            "investing": ("Investing.com", self._get_investing_quotes, symbols[:3])  # Limit to 3 symbols for Investing.com
+        }
         
-        # Try Investing.com for additional data
-        try:
-            investing_data = self._get_investing_quotes(symbols[:3])  # Limit to 3 symbols for Investing.com
-            if investing_data:
-                results["investing"] = investing_data
-                logger.info(f"Got market data for {len(investing_data)} symbols from Investing.com")
-        except Exception as e:
-            logger.error(f"Error getting Investing.com quotes: {e}")
+        with ThreadPoolExecutor(max_workers=len(source_requests)) as executor:
+            futures = {
+                key: executor.submit(fetch, source_symbols)
+                for key, (_, fetch, source_symbols) in source_requests.items()
+            }
+        
+        # Collect results in priority order (Yahoo Finance is the most reliable for quotes)
+        for key, future in futures.items():
+            source_name = source_requests[key][0]
+            try:
+                source_data = future.result()
+                if source_data:
+                    results[key] = source_data
+                    logger.info(f"Got market data for {len(source_data)} symbols from {source_name}")
+            except Exception as e:
+                logger.error(f"Error getting {source_name} quotes: {e}")
         
         # Combine data from all sources into a unified format
         unified_data = {}
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         for symbol in symbols:
             symbol_data = {
@@ -913,57 +1194,21 @@ class WebScraper:
                 "52w_high": None,
                 "52w_low": None,
                 "source": None,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                "timestamp": timestamp
             }
             
-            # Try Yahoo Finance data first
-            if "yahoo_finance" in results and symbol in results["yahoo_finance"]:
-                yahoo_symbol_data = results["yahoo_finance"][symbol]
-                symbol_data.update({
-                    "price": yahoo_symbol_data.get("price"),
-                    "change": yahoo_symbol_data.get("change"),
-                    "change_percent": yahoo_symbol_data.get("change_percent"),
-                    "volume": yahoo_symbol_data.get("volume"),
-                    "market_cap": yahoo_symbol_data.get("market_cap"),
-                    "pe_ratio": yahoo_symbol_data.get("pe_ratio"),
-                    "52w_high": yahoo_symbol_data.get("52w_high"),
-                    "52w_low": yahoo_symbol_data.get("52w_low"),
-                    "source": "Yahoo Finance"
-                })
-            
-            # Try Google Finance data next
-            if not symbol_data["price"] and "google_finance" in results and symbol in results["google_finance"]:
-                google_symbol_data = results["google_finance"][symbol]
-                symbol_data.update({
-                    "price": google_symbol_data.get("price") or symbol_data["price"],
-                    "change": google_symbol_data.get("change") or symbol_data["change"],
-                    "change_percent": google_symbol_data.get("change_percent") or symbol_data["change_percent"],
-                    "market_cap": google_symbol_data.get("market_cap") or symbol_data["market_cap"],
-                    "pe_ratio": google_symbol_data.get("pe_ratio") or symbol_data["pe_ratio"],
-                    "source": "Google Finance"
-                })
-            
-            # Fill in missing data from MarketWatch
-            if not symbol_data["price"] and "marketwatch" in results and symbol in results["marketwatch"]:
-                mw_symbol_data = results["marketwatch"][symbol]
-                symbol_data.update({
-                    "price": mw_symbol_data.get("price") or symbol_data["price"],
-                    "change": mw_symbol_data.get("change") or symbol_data["change"],
-                    "change_percent": mw_symbol_data.get("change_percent") or symbol_data["change_percent"],
-                    "volume": mw_symbol_data.get("volume") or symbol_data["volume"],
-                    "source": "MarketWatch"
-                })
-            
-            # Fill in missing data from Investing.com
-            if not symbol_data["price"] and "investing" in results and symbol in results["investing"]:
-                inv_symbol_data = results["investing"][symbol]
-                symbol_data.update({
-                    "price": inv_symbol_data.get("price") or symbol_data["price"],
-                    "change": inv_symbol_data.get("change") or symbol_data["change"],
-                    "change_percent": inv_symbol_data.get("change_percent") or symbol_data["change_percent"],
-                    "volume": inv_symbol_data.get("volume") or symbol_data["volume"],
-                    "source": "Investing.com"
-                })
+            # Take fields from the highest-priority source that has a price for this symbol
+            for source_key, source_name, fields in QUOTE_SOURCE_PRIORITY:
+                if symbol_data["price"]:
+                    break
+                source_symbol_data = results.get(source_key, {}).get(symbol)
+                if not source_symbol_data:
+                    continue
+                for field in fields:
+                    value = source_symbol_data.get(field)
+                    if value is not None:
+                        symbol_data[field] = value
+                symbol_data["source"] = source_name
             
             # Only add if we have at least a price
             if symbol_data["price"]:
@@ -973,110 +1218,89 @@ class WebScraper:
         if not unified_data:
             logger.warning("Using fallback market data")
             
-            # Generate fallback data for requested symbols
-            for symbol in symbols:
-                # Generate consistent but "random" values based on symbol
-                seed = sum(ord(c) for c in symbol)
-                random.seed(seed)
-                
-                price = round(random.uniform(50, 500), 2)
-                change = round(random.uniform(-10, 10), 2)
-                change_percent = round(change / price * 100, 2)
-                
+            # Generate consistent but "random" values based on each symbol. Every symbol gets
+            # its own seeded generator, so the global random state is left untouched.
+            seeds = [sum(ord(c) for c in symbol) for symbol in symbols]
+            draws = np.array([np.random.default_rng(seed).random(7) for seed in seeds]).reshape(-1, 7)
+            
+            prices = np.round(50 + draws[:, 0] * 450, 2)
+            changes = np.round(-10 + draws[:, 1] * 20, 2)
+            change_percents = np.round(changes / prices * 100, 2)
+            volumes = (100000 + draws[:, 2] * 9900000).astype(np.int64)
+            market_caps = (1000000000 + draws[:, 3] * 1999000000000).astype(np.int64)
+            pe_ratios = np.round(10 + draws[:, 4] * 30, 2)
+            highs_52w = np.round(prices * (1.1 + draws[:, 5] * 0.4), 2)
+            lows_52w = np.round(prices * (0.6 + draws[:, 6] * 0.3), 2)
+            # Convert back to Python scalars so the result stays JSON serializable
+            for symbol, price, change, change_percent, volume, market_cap, pe_ratio, high_52w, low_52w in zip(
+                symbols, prices.tolist(), changes.tolist(), change_percents.tolist(), volumes.tolist(),
+                market_caps.tolist(), pe_ratios.tolist(), highs_52w.tolist(), lows_52w.tolist()
+            ):
                 unified_data[symbol] = {
                     "symbol": symbol,
                     "name": self._get_company_name(symbol),
                     "price": price,
                     "change": change,
                     "change_percent": change_percent,
-                    "volume": random.randint(100000, 10000000),
-                    "market_cap": random.randint(1000000000, 2000000000000),
-                    "pe_ratio": round(random.uniform(10, 40), 2),
-                    "52w_high": round(price * random.uniform(1.1, 1.5), 2),
-                    "52w_low": round(price * random.uniform(0.6, 0.9), 2),
-                    "source": "Fallback Data",
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    "volume": volume,
+                    "market_cap": market_cap,
+                    "pe_ratio": pe_ratio,
+                    "52w_high": high_52w,
+                    "52w_low": low_52w,
+                    "source": FALLBACK_QUOTE_SOURCE,
+                    "timestamp": timestamp
                 }
         
         return unified_data
     
+    def _fetch_quotes_concurrently(self, fetch_quote, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Run a per-symbol quote fetcher over several symbols in parallel.
+        
+        Args:
+            fetch_quote: Function taking a symbol and returning its quote or None
+            symbols: List of stock symbols
+            
+        Returns:
+            Dictionary mapping symbols to the quotes that were found
+        """
+        if not symbols:
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(symbols))) as executor:
+            quotes = list(executor.map(fetch_quote, symbols))
+        
+        return {symbol: quote for symbol, quote in zip(symbols, quotes) if quote}
+    
     def _get_yahoo_finance_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
         """Get stock quotes from Yahoo Finance."""
         results = {}
         
         try:
-            # Yahoo Finance allows multiple symbols in one request
-            symbols_str = ",".join(symbols)
-            url = f"{self.yahoo_finance_base}/quote/{symbols_str}"
-            
-            soup = self._make_request(url)
-            if not soup:
+            # The quote API returns every field for all symbols in a single JSON response
+            url = f"{self.yahoo_finance_api_base}/v7/finance/quote"
+            data = self._make_api_request(url, {"symbols": ",".join(symbols)})
+            if not data:
                 return results
             
-            # Process each symbol
-            for symbol in symbols:
+            for quote in data.get("quoteResponse", {}).get("result") or []:
                 try:
-                    # Find the quote section for this symbol
-                    quote_section = soup.select_one(f"[data-symbol='{symbol}']")
-                    if not quote_section:
+                    symbol = quote.get("symbol")
+                    if not symbol:
                         continue
                     
-                    # Extract price
-                    price_elem = quote_section.select_one("[data-field='regularMarketPrice']")
-                    price = float(price_elem.text.replace(",", "")) if price_elem else None
-                    
-                    # Extract change
-                    change_elem = quote_section.select_one("[data-field='regularMarketChange']")
-                    change = float(change_elem.text.replace(",", "")) if change_elem else None
-                    
-                    # Extract change percent
-                    change_pct_elem = quote_section.select_one("[data-field='regularMarketChangePercent']")
-                    change_percent = float(change_pct_elem.text.replace("%", "").replace("(", "").replace(")", "")) if change_pct_elem else None
-                    
-                    # Extract volume
-                    volume_elem = quote_section.select_one("[data-field='regularMarketVolume']")
-                    volume = int(volume_elem.text.replace(",", "")) if volume_elem else None
-                    
-                    # Additional data requires navigating to the detailed quote page
-                    detailed_url = f"{self.yahoo_finance_base}/quote/{symbol}/key-statistics"
-                    detailed_soup = self._make_request(detailed_url)
-                    
-                    market_cap = None
-                    pe_ratio = None
-                    high_52w = None
-                    low_52w = None
-                    
-                    if detailed_soup:
-                        # Extract market cap
-                        market_cap_elem = detailed_soup.select_one("td[data-test='MARKET_CAP-value']")
-                        market_cap = market_cap_elem.text if market_cap_elem else None
-                        
-                        # Extract P/E ratio
-                        pe_elem = detailed_soup.select_one("td[data-test='PE_RATIO-value']")
-                        pe_text = pe_elem.text if pe_elem else ""
-                        pe_ratio = float(pe_text) if pe_text and pe_text != "N/A" else None
-                        
-                        # Extract 52-week high
-                        high_elem = detailed_soup.select_one("td[data-test='FIFTY_TWO_WK_RANGE-value']")
-                        if high_elem:
-                            range_text = high_elem.text
-                            if " - " in range_text:
-                                low, high = range_text.split(" - ")
-                                low_52w = float(low.replace(",", ""))
-                                high_52w = float(high.replace(",", ""))
-                    
                     results[symbol] = {
-                        "price": price,
-                        "change": change,
-                        "change_percent": change_percent,
-                        "volume": volume,
-                        "market_cap": market_cap,
-                        "pe_ratio": pe_ratio,
-                        "52w_high": high_52w,
-                        "52w_low": low_52w
+                        "price": quote.get("regularMarketPrice"),
+                        "change": quote.get("regularMarketChange"),
+                        "change_percent": quote.get("regularMarketChangePercent"),
+                        "volume": quote.get("regularMarketVolume"),
+                        "market_cap": quote.get("marketCap"),
+                        "pe_ratio": quote.get("trailingPE"),
+                        "52w_high": quote.get("fiftyTwoWeekHigh"),
+                        "52w_low": quote.get("fiftyTwoWeekLow")
                     }
                 except Exception as e:
-                    logger.error(f"Error parsing Yahoo Finance data for {symbol}: {e}")
+                    logger.error(f"Error parsing Yahoo Finance data for {quote.get('symbol')}: {e}")
         except Exception as e:
             logger.error(f"Error getting Yahoo Finance quotes: {e}")
         
@@ -1084,201 +1308,146 @@ class WebScraper:
     
     def _get_marketwatch_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
         """Get stock quotes from MarketWatch."""
-        results = {}
-        
-        # MarketWatch requires separate requests for each symbol
-        for symbol in symbols:
-            try:
-                url = f"{self.market_watch_base}/investing/stock/{symbol}"
-                
-                soup = self._make_request(url)
-                if not soup:
-                    continue
-                
-                # Extract price
-                price_elem = soup.select_one(".intraday__price .value")
-                price = float(price_elem.text.replace(",", "")) if price_elem else None
-                
-                # Extract change
-                change_elem = soup.select_one(".change--point--q .change--point--q")
-                change = float(change_elem.text.replace(",", "")) if change_elem else None
-                
-                # Extract change percent
-                change_pct_elem = soup.select_one(".change--percent--q")
-                change_percent = float(change_pct_elem.text.replace("%", "")) if change_pct_elem else None
-                
-                # Extract volume
-                volume_elem = soup.select_one(".kv__item:contains('Volume') .primary")
-                volume_text = volume_elem.text if volume_elem else ""
-                volume = None
-                if volume_text:
-                    # Handle format like "1.2M" or "345.67K"
-                    if "M" in volume_text:
-                        volume = float(volume_text.replace("M", "")) * 1000000
-                    elif "K" in volume_text:
-                        volume = float(volume_text.replace("K", "")) * 1000
-                    else:
-                        volume = float(volume_text.replace(",", ""))
-                    volume = int(volume)
-                
-                results[symbol] = {
-                    "price": price,
-                    "change": change,
-                    "change_percent": change_percent,
-                    "volume": volume
-                }
-            except Exception as e:
-                logger.error(f"Error getting MarketWatch data for {symbol}: {e}")
-        
-        return results
+        # MarketWatch requires separate requests for each symbol, so fetch them concurrently
+        return self._fetch_quotes_concurrently(self._get_marketwatch_quote, symbols)
+    
+    def _get_marketwatch_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get a single stock quote from MarketWatch."""
+        try:
+            url = f"{self.market_watch_base}/investing/stock/{symbol}"
+            
+            soup = self._fetch_and_parse(url)
+            if not soup:
+                return None
+            
+            # Extract price, change and change percent in one walk over the tree
+            fields = _select_fields(soup, MW_QUOTE_FIELDS_SELECTOR, MW_QUOTE_FIELD_SELECTORS)
+            price = _to_float(fields["price"].text) if "price" in fields else None
+            change = _to_float(fields["change"].text) if "change" in fields else None
+            change_percent = _to_float(fields["change_percent"].text) if "change_percent" in fields else None
+            
+            # Extract volume
+            volume_elem = None
+            for item in MW_KEY_DATA_ITEM_SELECTOR.select(soup):
+                if "Volume" in item.get_text():
+                    volume_elem = MW_KEY_DATA_VALUE_SELECTOR.select_one(item)
+                    break
+            volume = _to_suffix_float(volume_elem.text) if volume_elem else None
+            if volume is not None:
+                volume = int(volume)
+            
+            return {
+                "price": price,
+                "change": change,
+                "change_percent": change_percent,
+                "volume": volume
+            }
+        except Exception as e:
+            logger.error(f"Error getting MarketWatch data for {symbol}: {e}")
+            return None
     
     def _get_investing_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
         """Get stock quotes from Investing.com."""
-        results = {}
-        
-        # Investing.com requires separate requests for each symbol
-        for symbol in symbols:
-            try:
-                # Convert Yahoo Finance symbol format to Investing.com format
-                if symbol.startswith("^"):
-                    # It's an index
-                    if symbol == "^DJI":
-                        investing_symbol = "us-30"
-                    elif symbol == "^GSPC":
-                        investing_symbol = "us-spx-500"
-                    elif symbol == "^IXIC":
-                        investing_symbol = "nasdaq-composite"
-                    elif symbol == "^N225":
-                        investing_symbol = "japan-ni225"
-                    elif symbol == "^HSI":
-                        investing_symbol = "hang-sen-40"
-                    elif symbol == "^FTSE":
-                        investing_symbol = "uk-100"
-                    elif symbol == "^GDAXI":
-                        investing_symbol = "germany-30"
-                    elif symbol == "^FCHI":
-                        investing_symbol = "france-40"
-                    else:
-                        continue  # Skip unknown indices
-                else:
-                    # It's a stock
-                    investing_symbol = symbol.lower()
-                
-                url = f"{self.investing_base}/instruments/{investing_symbol}"
-                
-                soup = self._make_request(url)
-                if not soup:
-                    continue
-                
-                # Extract price
-                price_elem = soup.select_one(".instrument-price_last__KQzyA")
-                price = float(price_elem.text.replace(",", "")) if price_elem else None
-                
-                # Extract change
-                change_elem = soup.select_one(".instrument-price_change-value__jkuml")
-                change = float(change_elem.text.replace(",", "")) if change_elem else None
-                
-                # Extract change percent
-                change_pct_elem = soup.select_one(".instrument-price_change-percent__l93qX")
-                change_pct_text = change_pct_elem.text if change_pct_elem else ""
-                change_percent = float(change_pct_text.replace("%", "").replace("(", "").replace(")", "")) if change_pct_text else None
-                
-                # Extract volume
-                volume_elem = soup.select_one("div.key-info_row__QKb3Z:contains('Vol.') .key-info_value__RWVnj")
-                volume_text = volume_elem.text if volume_elem else ""
-                volume = None
-                if volume_text:
-                    # Handle format like "1.2M" or "345.67K"
-                    if "M" in volume_text:
-                        volume = float(volume_text.replace("M", "")) * 1000000
-                    elif "K" in volume_text:
-                        volume = float(volume_text.replace("K", "")) * 1000
-                    else:
-                        volume = float(volume_text.replace(",", ""))
-                    volume = int(volume)
-                
-                results[symbol] = {
-                    "price": price,
-                    "change": change,
-                    "change_percent": change_percent,
-                    "volume": volume
-                }
-            except Exception as e:
-                logger.error(f"Error getting Investing.com data for {symbol}: {e}")
-        
-        return results
+        # Investing.com requires separate requests for each symbol, so fetch them concurrently
+        return self._fetch_quotes_concurrently(self._get_investing_quote, symbols)
+    
+    def _get_investing_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get a single stock quote from Investing.com."""
+        try:
+            # Convert Yahoo Finance symbol format to Investing.com format
+            if symbol.startswith("^"):
+                # It's an index
+                investing_symbol = INVESTING_INDEX_SYMBOLS.get(symbol)
+                if investing_symbol is None:
+                    return None  # Skip unknown indices
+            else:
+                # It's a stock
+                investing_symbol = symbol.lower()
+            
+            url = f"{self.investing_base}/instruments/{investing_symbol}"
+            
+            soup = self._fetch_and_parse(url)
+            if not soup:
+                return None
+            
+            # Extract price, change and change percent in one walk over the tree
+            fields = _select_fields(soup, INVESTING_QUOTE_FIELDS_SELECTOR, INVESTING_QUOTE_FIELD_SELECTORS)
+            price = _to_float(fields["price"].text) if "price" in fields else None
+            change = _to_float(fields["change"].text) if "change" in fields else None
+            change_percent = _to_float(fields["change_percent"].text) if "change_percent" in fields else None
+            
+            # Extract volume
+            volume_elem = None
+            for row in INVESTING_KEY_INFO_ROW_SELECTOR.select(soup):
+                if "Vol." in row.get_text():
+                    volume_elem = INVESTING_KEY_INFO_VALUE_SELECTOR.select_one(row)
+                    break
+            volume = _to_suffix_float(volume_elem.text) if volume_elem else None
+            if volume is not None:
+                volume = int(volume)
+            
+            return {
+                "price": price,
+                "change": change,
+                "change_percent": change_percent,
+                "volume": volume
+            }
+        except Exception as e:
+            logger.error(f"Error getting Investing.com data for {symbol}: {e}")
+            return None
     
     def _get_google_finance_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
         """Get stock quotes from Google Finance."""
-        results = {}
-        
-        # Google Finance requires separate requests for each symbol
-        for symbol in symbols:
-            try:
-                # Handle indices differently
-                if symbol.startswith("^"):
-                    if symbol == "^DJI":
-                        url = f"{self.google_finance_base}/quote/.DJI:INDEXDJX"
-                    elif symbol == "^GSPC":
-                        url = f"{self.google_finance_base}/quote/.INX:INDEXSP"
-                    elif symbol == "^IXIC":
-                        url = f"{self.google_finance_base}/quote/.IXIC:INDEXNASDAQ"
-                    elif symbol == "^N225":
-                        url = f"{self.google_finance_base}/quote/NI225:INDEXNIKKEI"
-                    elif symbol == "^HSI":
-                        url = f"{self.google_finance_base}/quote/HSI:INDEXHANGSENG"
-                    elif symbol == "^FTSE":
-                        url = f"{self.google_finance_base}/quote/FTSE:INDEXFTSE"
-                    else:
-                        continue
-                else:
-                    url = f"{self.google_finance_base}/quote/{symbol}"
-                
-                soup = self._make_request(url)
-                if not soup:
-                    continue
-                
-                # Extract price
-                price_elem = soup.select_one("div[data-last-price]")
-                price = float(price_elem.get("data-last-price", 0)) if price_elem else None
-                
-                # Extract change
-                change_elem = soup.select_one("div[data-last-price]")
-                change = float(change_elem.get("data-price-change", 0)) if change_elem else None
-                
-                # Extract change percent
-                change_pct_elem = soup.select_one("div[data-last-price]")
-                change_percent = float(change_elem.get("data-price-change-percent", 0).replace("%", "")) if change_pct_elem else None
-                
-                # Extract additional info
-                info_divs = soup.select("div.gyFHrc")
-                market_cap = None
-                pe_ratio = None
+        # Google Finance requires separate requests for each symbol, so fetch them concurrently
+        return self._fetch_quotes_concurrently(self._get_google_finance_quote, symbols)
+    
+    def _get_google_finance_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get a single stock quote from Google Finance."""
+        try:
+            # Handle indices differently
+            if symbol.startswith("^"):
+                google_symbol = GOOGLE_INDEX_SYMBOLS.get(symbol)
+                if google_symbol is None:
+                    return None
+                url = f"{self.google_finance_base}/quote/{google_symbol}"
+            else:
+                url = f"{self.google_finance_base}/quote/{symbol}"
+            
+            soup = self._fetch_and_parse(url)
+            if not soup:
+                return None
+            
+            # Price, change and change percent are all attributes of the same element
+            price_elem = GOOGLE_PRICE_SELECTOR.select_one(soup)
+            price = float(price_elem.get("data-last-price", 0)) if price_elem else None
+            change = float(price_elem.get("data-price-change", 0)) if price_elem else None
+            change_percent = float(str(price_elem.get("data-price-change-percent", 0)).replace("%", "")) if price_elem else None
+            
+            # Extract additional info
+            info_divs = GOOGLE_INFO_ROW_SELECTOR.select(soup)
+            market_cap = None
+            pe_ratio = None
+            
+            for div in info_divs:
+                label = GOOGLE_INFO_LABEL_SELECTOR.select_one(div)
+                value = GOOGLE_INFO_VALUE_SELECTOR.select_one(div)
                 
-                for div in info_divs:
-                    label = div.select_one("div.mfs7Fc")
-                    value = div.select_one("div.P6K39c")
+                if label and value:
+                    label_text = label.text.strip()
+                    value_text = value.text.strip()
                     
-                    if label and value:
-                        label_text = label.text.strip()
-                        value_text = value.text.strip()
-                        
-                        if "Market cap" in label_text:
-                            market_cap = value_text
-                        elif "P/E ratio" in label_text:
-                            try:
-                                pe_ratio = float(value_text)
-                            except:
-                                pe_ratio = None
-                
-                results[symbol] = {
-                    "price": price,
-                    "change": change,
-                    "change_percent": change_percent,
-                    "market_cap": market_cap,
-                    "pe_ratio": pe_ratio
-                }
-            except Exception as e:
-                logger.error(f"Error getting Google Finance data for {symbol}: {e}")
-        
-        return results 
\ No newline at end of file
+                    if "Market cap" in label_text:
+                        market_cap = value_text
+                    elif "P/E ratio" in label_text:
+                        pe_ratio = _to_float(value_text)
+            
+            return {
+                "price": price,
+                "change": change,
+                "change_percent": change_percent,
+                "market_cap": market_cap,
+                "pe_ratio": pe_ratio
+            }
+        except Exception as e:
+            logger.error(f"Error getting Google Finance data for {symbol}: {e}")
+            return None
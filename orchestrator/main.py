@@ -4,12 +4,23 @@ Orchestrator for coordinating multiple agents in the finance assistant system.
 import os
 import sys
 import logging
+import logging.handlers
+import queue
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import asyncio
-from fastapi import FastAPI, HTTPException, Body, Request
+import functools
+import hashlib
+import hmac
+import itertools
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Body, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse, Response as RawResponse
+from pydantic import BaseModel, ConfigDict
 import uvicorn
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
@@ -17,32 +28,170 @@ from dotenv import load_dotenv
 # Add parent directory to path to import agents
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.voice_agent import VoiceAgent
 from agents.language_agent import LanguageAgent
 from agents.analysis_agent import AnalysisAgent
 from agents.api_agent import APIAgent
 from agents.scraping_agent import ScrapingAgent
 from agents.retriever_agent import RetrieverAgent
+from orchestrator.server import bind_server_socket
+from data_ingestion.web_scraper import WebScraper
+
+# Redis is optional; without it agent data is fetched live on every request
+try:
+    import redis.asyncio as redis_asyncio
+    from redis.exceptions import RedisError
+except ImportError:
+    redis_asyncio = None
+    RedisError = Exception
+
+# orjson is optional; it parses JSON several times faster than the standard library
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; force replaces any handlers installed while the agent modules were imported
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    force=True
+)
 logger = logging.getLogger(__name__)
 
+def start_log_listener() -> logging.handlers.QueueListener:
+    """
+    Route root log records through a queue so handler I/O runs on a listener thread.
+    
+    Returns:
+        The started listener, which owns the original root handlers
+    """
+    root_logger = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+def stop_log_listener(listener: logging.handlers.QueueListener):
+    """
+    Flush queued log records and restore the original root handlers.
+    
+    Args:
+        listener: Listener returned by start_log_listener
+    """
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
+
+# Shared cache for agent data, enabled by setting REDIS_URL
+REDIS_URL = os.getenv("REDIS_URL", "")
+QUOTE_CACHE_TTL_SECONDS = 60
+NEWS_CACHE_TTL_SECONDS = 600
+PORTFOLIO_CACHE_TTL_SECONDS = 86400
+redis_client = None
+
+# Agent calls block on network I/O, so the default executor is sized well above the CPU count
+IO_THREADS = int(os.getenv("IO_THREADS", "128"))
+
+# Voice support can be switched off for text-only deployments
+ENABLE_VOICE = os.getenv("ENABLE_VOICE", "1").lower() in ("1", "true", "yes")
+
+# Reply to voice queries when ENABLE_VOICE is off
+VOICE_DISABLED_TEXT = "Voice queries are disabled on this server. Please use text input instead."
+
+# Spoken apology for failed voice queries
+VOICE_ERROR_TEXT = "I'm sorry, there was an error processing your voice query. Please try again or use text input instead."
+
+# Smallest audio upload worth transcribing (a WAV header alone is 44 bytes), and the largest accepted
+MIN_AUDIO_FILE_BYTES = 512
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+
+# Operator endpoints (/metrics, /cache/flush) require this token in an X-Admin-Token header;
+# they are disabled when it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Micro-batching of text generation across concurrent requests
+GENERATION_BATCH_WINDOW_SECONDS = 0.02
+GENERATION_MAX_BATCH = 8
+generation_queue = None
+generation_sequence = itertools.count()
+
+# Query intents, doubling as scheduling priorities (lower is served first)
+SIMPLE_LOOKUP = 0
+MARKET_BRIEF = 1
+DEEP_REPORT = 2
+SIMPLE_LOOKUP_RE = re.compile(r"\b(price|quote|trading at|how much is|worth)\b", re.IGNORECASE)
+DEEP_REPORT_RE = re.compile(r"\b(report|analy[sz]e|analysis|compare|outlook|exposure|risk|portfolio)\b", re.IGNORECASE)
+SIMPLE_LOOKUP_MAX_CHARS = 80
+
+# Market brief inputs are shared between requests and rebuilt once the snapshot expires
+SNAPSHOT_TTL_SECONDS = 30
+market_snapshot: Dict[str, Any] = {}
+market_snapshot_expires = 0.0
+market_snapshot_lock = asyncio.Lock()
+
+# Full pipelines share a bounded number of slots so they cannot crowd out simple lookups
+FULL_PIPELINE_CONCURRENCY = int(os.getenv("FULL_PIPELINE_CONCURRENCY", "8"))
+full_pipeline_semaphore = asyncio.Semaphore(FULL_PIPELINE_CONCURRENCY)
+
+# JSON responses are encoded with orjson when it is installed
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
 # Define lifespan context
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global redis_client, generation_queue
+    
     # Startup: initialize agents and resources
+    log_listener = start_log_listener()
     logger.info("Starting Finance Assistant Orchestrator")
+    
+    io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="agent-io")
+    asyncio.get_running_loop().set_default_executor(io_executor)
+    
+    if REDIS_URL and redis_asyncio is not None:
+        try:
+            redis_client = redis_asyncio.from_url(REDIS_URL)
+            await redis_client.ping()
+            logger.info("Connected to Redis agent data cache")
+        except RedisError as e:
+            logger.warning("Redis unavailable, agent data will not be cached: %s", e)
+            redis_client = None
+    elif REDIS_URL:
+        logger.warning("REDIS_URL is set but the redis package is not installed")
+    
+    # Load agents off the event loop before serving; text-only deployments skip the voice stack
+    agent_factories = [get_language_agent, get_analysis_agent, get_api_agent, get_scraping_agent, get_retriever_agent]
+    if ENABLE_VOICE:
+        agent_factories.append(get_voice_agent)
+    for factory in agent_factories:
+        await run_blocking(factory)
+    
+    generation_queue = asyncio.PriorityQueue()
+    generation_worker = asyncio.create_task(generation_batch_worker())
+    
     yield
+    
     # Shutdown: cleanup resources
     logger.info("Shutting down Finance Assistant Orchestrator")
+    generation_worker.cancel()
+    generation_queue = None
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+    if get_web_scraper.cache_info().currsize:
+        get_web_scraper().session.close()
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    stop_log_listener(log_listener)
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
     title="Finance Assistant Orchestrator",
+    default_response_class=DefaultJSONResponse,
     lifespan=lifespan
 )
 
@@ -55,38 +204,353 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Health check payload, encoded once at import time
+HEALTH_BODY = json.dumps({"status": "online", "message": "Finance Assistant Orchestrator is running"}).encode()
+HEALTH_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(HEALTH_BODY)).encode())
+]
+
+class HealthCheckMiddleware:
+    """
+    Answer /health before routing, so load balancer probes skip the rest of the stack.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/health":
+            await send({"type": "http.response.start", "status": 200, "headers": HEALTH_HEADERS})
+            await send({"type": "http.response.body", "body": HEALTH_BODY})
+            return
+        await self.app(scope, receive, send)
+
+# Added last so it runs first
+app.add_middleware(HealthCheckMiddleware)
+
 # Input and output models
 class VoiceQuery(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     audio_file_path: str
 
 class TextQuery(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     text: str
     context: Optional[Dict[str, Any]] = None
 
+class QueryError(Exception):
+    """
+    An unexpected failure while answering a query.
+    
+    Raised by the query endpoints and answered by handle_query_error, which runs
+    inside the middleware stack, so the error response still gets CORS headers.
+    """
+    
+    def __init__(self, error: Exception, fallback_text: Optional[str] = None):
+        super().__init__(str(error))
+        self.error = error
+        self.fallback_text = fallback_text
+
 class Response(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     text: str
     audio_file_path: Optional[str] = None
     success: bool
     error: Optional[str] = None
     transcription: Optional[str] = None
 
-# Initialize agents
-voice_agent = VoiceAgent()
-language_agent = LanguageAgent()
-analysis_agent = AnalysisAgent()
-api_agent = APIAgent()
-scraping_agent = ScrapingAgent()
-retriever_agent = RetrieverAgent()
+# Text queries currently being answered, keyed like the response cache (single-flight)
+inflight_queries: Dict[str, asyncio.Future] = {}
+
+# Cache of successful text query responses, keyed by normalized query text and context (LRU with TTL)
+RESPONSE_CACHE_MAX_SIZE = 1024
+RESPONSE_CACHE_TTL_SECONDS = 900
+response_cache: "OrderedDict[str, tuple]" = OrderedDict()
+response_cache_stats = {"hits": 0, "misses": 0}
+
+def _query_key(query_text: str, context: Optional[Dict[str, Any]] = None) -> str:
+    """Build a cache key from the normalized query text and, if given, the request context."""
+    key_text = query_text.strip().lower()
+    if context:
+        key_text += "\0" + json.dumps(context, sort_keys=True, default=str)
+    return hashlib.blake2b(key_text.encode(), digest_size=16).hexdigest()
+
+def get_cached_response(query_text: str, context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached response for a query.
+    
+    Args:
+        query_text: Query text
+        context: Optional additional context from the request
+        
+    Returns:
+        Copy of the cached response, or None on a miss or expired entry
+    """
+    key = _query_key(query_text, context)
+    entry = response_cache.get(key)
+    if entry and time.monotonic() - entry[1] < RESPONSE_CACHE_TTL_SECONDS:
+        response_cache.move_to_end(key)
+        response_cache_stats["hits"] += 1
+        return dict(entry[0])
+    
+    if entry:
+        del response_cache[key]
+    response_cache_stats["misses"] += 1
+    return None
+
+def store_cached_response(query_text: str, response: Dict[str, Any],
+                          context: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Store a response in the cache, evicting the least recently used entry when full.
+    
+    Args:
+        query_text: Query text
+        response: Response dictionary
+        context: Optional additional context from the request
+    """
+    key = _query_key(query_text, context)
+    response_cache[key] = (dict(response), time.monotonic())
+    response_cache.move_to_end(key)
+    while len(response_cache) > RESPONSE_CACHE_MAX_SIZE:
+        response_cache.popitem(last=False)
+
+# Agents are created on first use (or while the app starts), not at import time
+@functools.lru_cache(maxsize=1)
+def get_web_scraper() -> WebScraper:
+    """Shared scraper: one pooled keep-alive HTTP session for every agent's outbound requests."""
+    return WebScraper()
+
+@functools.lru_cache(maxsize=1)
+def get_voice_agent():
+    """Voice agent; its speech libraries are only imported when voice is used."""
+    from agents.voice_agent import VoiceAgent
+    return VoiceAgent()
+
+@functools.lru_cache(maxsize=1)
+def get_language_agent() -> LanguageAgent:
+    """Language agent singleton."""
+    return LanguageAgent()
+
+@functools.lru_cache(maxsize=1)
+def get_analysis_agent() -> AnalysisAgent:
+    """Analysis agent singleton."""
+    return AnalysisAgent()
+
+@functools.lru_cache(maxsize=1)
+def get_api_agent() -> APIAgent:
+    """API agent singleton."""
+    return APIAgent(web_scraper=get_web_scraper())
+
+@functools.lru_cache(maxsize=1)
+def get_scraping_agent() -> ScrapingAgent:
+    """Scraping agent singleton."""
+    return ScrapingAgent(get_web_scraper())
 
-@app.get("/")
+@functools.lru_cache(maxsize=1)
+def get_retriever_agent() -> RetrieverAgent:
+    """Retriever agent singleton."""
+    return RetrieverAgent()
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking agent call in the default thread pool.
+    
+    Args:
+        func: Synchronous function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+        
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+async def cached_agent_call(key: str, ttl_seconds: int, func, *args, **kwargs):
+    """
+    Run a blocking agent call through the Redis cache.
+    
+    Falls back to calling the agent directly when Redis is not configured or fails.
+    Empty results and agent error payloads ({"error": ...}) are returned but not cached.
+    
+    Args:
+        key: Cache key
+        ttl_seconds: Time-to-live of the cached result
+        func: Synchronous agent method returning JSON-serializable data
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+        
+    Returns:
+        The agent method's (possibly cached) return value; with Redis it is returned
+        as decoded JSON on hits and misses alike, so both give the same types
+    """
+    if redis_client is None:
+        return await run_blocking(func, *args, **kwargs)
+    
+    try:
+        cached_value = await redis_client.get(key)
+        if cached_value is not None:
+            return json_loads(cached_value)
+    except RedisError as e:
+        logger.warning("Redis read failed for %s: %s", key, e)
+        return await run_blocking(func, *args, **kwargs)
+    
+    value = await run_blocking(func, *args, **kwargs)
+    
+    # Agent methods report failures as {"error": ...}; caching one would serve it for the whole TTL
+    if not value or (isinstance(value, dict) and "error" in value):
+        return value
+    
+    try:
+        serialized = json.dumps(value, default=str)
+    except (TypeError, ValueError) as e:
+        logger.warning("Could not serialize %s for caching: %s", key, e)
+        return value
+    
+    try:
+        await redis_client.setex(key, ttl_seconds, serialized)
+    except RedisError as e:
+        logger.warning("Redis write failed for %s: %s", key, e)
+    
+    # Return what a cache hit would, so datetimes and numpy values become strings and floats either way
+    return json_loads(serialized)
+
+async def generation_batch_worker():
+    """
+    Collect generation requests arriving within a short window and run them concurrently.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await generation_queue.get()]
+        try:
+            deadline = loop.time() + GENERATION_BATCH_WINDOW_SECONDS
+            
+            while len(batch) < GENERATION_MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(generation_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Each generation gets its own executor job so one slow call does not hold up the rest
+            results = await asyncio.gather(
+                *(run_blocking(get_language_agent().generate_text, **kwargs) for _, _, kwargs, _ in batch),
+                return_exceptions=True
+            )
+        except Exception as e:
+            logger.exception("Generation batch failed")
+            results = [e] * len(batch)
+        
+        for (_, _, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+async def batched_generate(priority: int = MARKET_BRIEF, **kwargs) -> str:
+    """
+    Generate a text response through the micro-batching queue.
+    
+    Args:
+        priority: Query intent; lower values are taken into a batch first
+        **kwargs: Keyword arguments for LanguageAgent.generate_text
+        
+    Returns:
+        Generated response text
+    """
+    if generation_queue is None:
+        return await run_blocking(get_language_agent().generate_text, **kwargs)
+    
+    future = asyncio.get_running_loop().create_future()
+    await generation_queue.put((priority, next(generation_sequence), kwargs, future))
+    return await future
+
+def classify_query(query_text: str) -> int:
+    """
+    Classify a query by the amount of pipeline work it needs.
+    
+    Args:
+        query_text: Query text
+        
+    Returns:
+        SIMPLE_LOOKUP, MARKET_BRIEF or DEEP_REPORT
+    """
+    if DEEP_REPORT_RE.search(query_text):
+        return DEEP_REPORT
+    if len(query_text) <= SIMPLE_LOOKUP_MAX_CHARS and SIMPLE_LOOKUP_RE.search(query_text):
+        return SIMPLE_LOOKUP
+    return MARKET_BRIEF
+
+@app.exception_handler(QueryError)
+async def handle_query_error(request: Request, exc: QueryError):
+    """
+    Turn a failed query into the standard query response, with success false.
+    
+    Voice requests also get their apology rendered as speech.
+    """
+    logger.error("Error processing %s: %s", request.url.path, exc.error, exc_info=exc.error)
+    
+    audio_path = None
+    if exc.fallback_text is not None:
+        try:
+            audio_path = await run_blocking(get_voice_agent().text_to_speech_file, exc.fallback_text)
+        except Exception as e:
+            logger.warning("Could not voice the error response: %s", e)
+    
+    return DefaultJSONResponse(_error_response(exc.error, exc.fallback_text, audio_path))
+
+@app.get("/", response_class=RawResponse)
 async def root():
     """Health check endpoint."""
-    return {"status": "online", "message": "Finance Assistant Orchestrator is running"}
+    return RawResponse(HEALTH_BODY, media_type="application/json")
 
-@app.post("/query/voice", response_model=Response)
-async def process_voice_query(query: VoiceQuery):
+def require_admin(request: Request):
     """
-    Process a voice query.
+    Reject requests to operator endpoints without the admin token.
+    
+    Raises:
+        HTTPException: 404 if ADMIN_TOKEN is unset, 403 if the token is missing or wrong
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Response cache statistics."""
+    require_admin(request)
+    return {
+        "response_cache": {
+            "hits": response_cache_stats["hits"],
+            "misses": response_cache_stats["misses"],
+            "size": len(response_cache),
+            "max_size": RESPONSE_CACHE_MAX_SIZE,
+            "ttl_seconds": RESPONSE_CACHE_TTL_SECONDS
+        }
+    }
+
+@app.post("/cache/flush")
+async def flush_cache(request: Request):
+    """Clear the response cache."""
+    require_admin(request)
+    flushed = len(response_cache)
+    response_cache.clear()
+    logger.info("Flushed %s cached responses", flushed)
+    return {"success": True, "flushed": flushed}
+
+async def answer_voice_query(audio: Union[str, bytes]) -> Dict[str, Any]:
+    """
+    Answer a voice query.
     
     Steps:
     1. Transcribe audio to text
@@ -94,96 +558,136 @@ async def process_voice_query(query: VoiceQuery):
     3. Generate a voice response
     
     Args:
-        query: Voice query with audio file path
+        audio: Recording as a file path or raw bytes
         
     Returns:
         Response with text and audio file path
     """
-    logger.info(f"Processing voice query: {query.audio_file_path}")
-    
     try:
-        # Check if the audio file exists
-        if not os.path.exists(query.audio_file_path):
-            logger.error(f"Audio file not found: {query.audio_file_path}")
-            return {
-                "text": "I'm sorry, the audio file could not be found.",
-                "audio_file_path": None,
-                "transcription": None,
-                "success": False,
-                "error": f"Audio file not found: {query.audio_file_path}"
-            }
-        
         # Step 1: Transcribe audio to text
-        transcription_result = voice_agent.process_voice_query(query.audio_file_path)
+        transcription = await run_blocking(get_voice_agent().speech_to_text, audio)
         
-        if not transcription_result["success"]:
+        if transcription is None:
             # If transcription fails, return a helpful error message
-            error_msg = transcription_result.get("error", "Unknown transcription error")
             fallback_text = "I'm sorry, I couldn't understand the audio. Please try speaking more clearly or using text input instead."
             
-            # Generate voice response for the error message
-            voice_response = voice_agent.generate_voice_response(fallback_text)
-            
             return {
                 "text": fallback_text,
-                "audio_file_path": voice_response.get("audio_file"),
+                "audio_file_path": await run_blocking(get_voice_agent().text_to_speech_file, fallback_text),
                 "transcription": None,
                 "success": False,
-                "error": error_msg
+                "error": "Speech recognition failed"
             }
         
-        transcription = transcription_result["transcription"]
-        logger.info(f"Transcription: {transcription}")
+        logger.info("Transcription: %s", transcription)
         
         # If transcription is empty or too short, return an error
-        if not transcription or len(transcription.strip()) < 3:
+        if len(transcription.strip()) < 3:
             fallback_text = "I couldn't detect any speech in the audio. Please try again."
-            voice_response = voice_agent.generate_voice_response(fallback_text)
             
             return {
                 "text": fallback_text,
-                "audio_file_path": voice_response.get("audio_file"),
+                "audio_file_path": await run_blocking(get_voice_agent().text_to_speech_file, fallback_text),
                 "transcription": transcription,
                 "success": False,
                 "error": "Empty or too short transcription"
             }
         
         # Step 2: Process the query with the language agent
-        text_query = TextQuery(text=transcription)
-        response = await process_text_query_internal(text_query)
+        response = await process_text_query_internal(transcription)
         
         # Step 3: Generate a voice response
-        voice_response = voice_agent.generate_voice_response(response["text"])
+        audio_path = await run_blocking(get_voice_agent().text_to_speech_file, response["text"])
         
-        if not voice_response["success"]:
-            logger.warning(f"Failed to generate voice response: {voice_response['error']}")
+        if audio_path is None:
+            logger.warning("Failed to generate voice response")
         
         return {
             "text": response["text"],
-            "audio_file_path": voice_response.get("audio_file"),
+            "audio_file_path": audio_path,
             "transcription": transcription,
             "success": True,
             "error": None
         }
-        
     except Exception as e:
-        logger.error(f"Error processing voice query: {e}")
+        # Answered by handle_query_error with this apology, spoken
+        raise QueryError(e, VOICE_ERROR_TEXT) from e
+
+def _audio_rejected_response(text: str, error: str) -> Dict[str, Any]:
+    """Build the response returned when a recording is rejected before transcription."""
+    return {
+        "text": text,
+        "audio_file_path": None,
+        "transcription": None,
+        "success": False,
+        "error": error
+    }
+
+@app.post("/query/voice", response_model=Response)
+async def process_voice_query(query: VoiceQuery):
+    """
+    Process a voice query recorded to a file the server can read.
+    
+    Args:
+        query: Voice query with audio file path
         
-        # Generate a fallback response
-        fallback_text = "I'm sorry, there was an error processing your voice query. Please try again or use text input instead."
-        try:
-            voice_response = voice_agent.generate_voice_response(fallback_text)
-            audio_path = voice_response.get("audio_file")
-        except:
-            audio_path = None
+    Returns:
+        Response with text and audio file path
+    """
+    logger.info("Processing voice query: %s", query.audio_file_path)
+    
+    if not ENABLE_VOICE:
+        return _audio_rejected_response(VOICE_DISABLED_TEXT, "Voice support is disabled (ENABLE_VOICE=0)")
+    
+    # Check the audio file with a single stat, off the event loop
+    try:
+        audio_stat = await run_blocking(os.stat, query.audio_file_path)
+    except FileNotFoundError:
+        logger.error("Audio file not found: %s", query.audio_file_path)
+        return _audio_rejected_response(
+            "I'm sorry, the audio file could not be found.",
+            f"Audio file not found: {query.audio_file_path}"
+        )
+    
+    # Reject empty or truncated recordings before running speech recognition
+    if audio_stat.st_size < MIN_AUDIO_FILE_BYTES:
+        logger.error("Audio file too small (%s bytes): %s", audio_stat.st_size, query.audio_file_path)
+        return _audio_rejected_response(
+            "I'm sorry, the recording is too short. Please try again.",
+            f"Audio file too small: {audio_stat.st_size} bytes"
+        )
+    
+    return await answer_voice_query(query.audio_file_path)
+
+@app.post("/query/voice/upload", response_model=Response)
+async def process_voice_upload(audio: UploadFile = File(...)):
+    """
+    Process a voice query uploaded as a multipart/form-data file.
+    
+    The raw bytes are transcribed from memory, so clients send no base64 copy and
+    the server writes no temporary file.
+    
+    Args:
+        audio: Uploaded recording
         
-        return {
-            "text": fallback_text,
-            "audio_file_path": audio_path,
-            "transcription": None,
-            "success": False,
-            "error": str(e)
-        }
+    Returns:
+        Response with text and audio file path
+    """
+    logger.info("Processing uploaded voice query: %s", audio.filename)
+    
+    if not ENABLE_VOICE:
+        return _audio_rejected_response(VOICE_DISABLED_TEXT, "Voice support is disabled (ENABLE_VOICE=0)")
+    
+    # Read one byte past the limit, so oversized uploads are detected without reading them whole
+    audio_bytes = await audio.read(MAX_AUDIO_BYTES + 1)
+    if len(audio_bytes) < MIN_AUDIO_FILE_BYTES or len(audio_bytes) > MAX_AUDIO_BYTES:
+        logger.error("Uploaded audio size out of bounds (%s bytes): %s", len(audio_bytes), audio.filename)
+        return _audio_rejected_response(
+            "I'm sorry, the recording is too short or too large. Please try again.",
+            f"Audio upload size out of bounds: {len(audio_bytes)} bytes"
+        )
+    
+    return await answer_voice_query(audio_bytes)
 
 @app.post("/query/text", response_model=Response)
 async def process_text_query(query: TextQuery):
@@ -196,64 +700,198 @@ async def process_text_query(query: TextQuery):
     Returns:
         Response with processed query
     """
-    logger.info(f"Processing text query: {query.text}")
+    logger.info("Processing text query: %s", query.text)
+    
+    try:
+        return await process_text_query_internal(query.text, query.context)
+    except Exception as e:
+        raise QueryError(e) from e
+
+async def fetch_query_data(query_text: str, intent: int) -> Dict[str, Any]:
+    """
+    Gather the agent data needed to answer a text query.
+    
+    Args:
+        query_text: Query text
+        intent: Query intent from classify_query
+        
+    Returns:
+        Dictionary with retrieval_results, market_data and scraping_data
+    """
+    market_key = f"market:{_query_key(query_text)}"
+    
+    if intent == SIMPLE_LOOKUP:
+        # A price lookup only needs market data
+        try:
+            market_data = await cached_agent_call(market_key, QUOTE_CACHE_TTL_SECONDS,
+                                                  get_api_agent().get_market_data, query=query_text)
+        except Exception as e:
+            logger.error("Error getting market data: %s", e)
+            market_data = None
+        return {"retrieval_results": None, "market_data": market_data, "scraping_data": None}
+    
+    # Retrieve relevant information, market data and scraped data concurrently
+    async with full_pipeline_semaphore:
+        retrieval_results, market_data, scraping_data = await asyncio.gather(
+            run_blocking(get_retriever_agent().retrieve_information, query_text),
+            cached_agent_call(market_key, QUOTE_CACHE_TTL_SECONDS,
+                              get_api_agent().get_market_data, query=query_text),
+            cached_agent_call(f"news:relevant:{_query_key(query_text)}", NEWS_CACHE_TTL_SECONDS,
+                              get_scraping_agent().get_relevant_data, query_text),
+            return_exceptions=True
+        )
+    
+    # Market data is optional, but retrieval and scraping failures still fail the query
+    if isinstance(market_data, Exception):
+        logger.error("Error getting market data: %s", market_data)
+        market_data = None
+    for result in (retrieval_results, scraping_data):
+        if isinstance(result, Exception):
+            raise result
+    
+    return {"retrieval_results": retrieval_results, "market_data": market_data, "scraping_data": scraping_data}
+
+async def generate_text_response(query_text: str, intent: int, query_data: Dict[str, Any],
+                                 context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Generate, format and cache the answer to a text query.
+    
+    Args:
+        query_text: Query text
+        intent: Query intent from classify_query
+        query_data: Agent data from fetch_query_data
+        context: Optional additional context from the request, part of the cache key
+        
+    Returns:
+        Response with processed query
+    """
+    # Generate text response, batched with concurrent requests
+    response_text = await batched_generate(intent, query=query_text, **query_data)
+    
+    # Format the response for better readability
+    formatted_response = format_response(response_text)
     
-    return await process_text_query_internal(query)
+    response = {
+        "text": formatted_response,
+        "audio_file_path": None,
+        "success": True,
+        "error": None,
+        "transcription": None
+    }
+    store_cached_response(query_text, response, context)
+    
+    return response
+
+def _error_response(e: Exception, text: Optional[str] = None, audio_file_path: Optional[str] = None) -> Dict[str, Any]:
+    """Build the response returned when a query fails."""
+    return {
+        "text": text or f"Error processing query: {str(e)}",
+        "audio_file_path": audio_file_path,
+        "success": False,
+        "error": str(e),
+        "transcription": None
+    }
 
-async def process_text_query_internal(query: TextQuery):
+async def process_text_query_internal(query_text: str, context: Optional[Dict[str, Any]] = None):
     """
     Internal function to process a text query.
     
     Args:
-        query: Text query
+        query_text: Query text
+        context: Optional additional context from the request
         
     Returns:
         Response with processed query
     """
+    # Repeated queries are answered from the response cache
+    cached_response = get_cached_response(query_text, context)
+    if cached_response is not None:
+        return cached_response
+    
+    # Identical queries already being answered share that answer instead of re-running the pipeline
+    key = _query_key(query_text, context)
+    inflight = inflight_queries.get(key)
+    if inflight is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            # Only recompute if the original request went away; re-raise our own cancellation
+            if not inflight.cancelled():
+                raise
+    
+    future = asyncio.get_running_loop().create_future()
+    # Mark failures as retrieved even when no identical request is waiting on them
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    inflight_queries[key] = future
     try:
-        # Extract query text from the TextQuery object
-        query_text = query.text if hasattr(query, 'text') else query.get('text', '')
+        response = await answer_text_query(query_text, context)
+        future.set_result(response)
+        return response
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        if inflight_queries.get(key) is future:
+            del inflight_queries[key]
+
+async def answer_text_query(query_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run the text query pipeline.
+    
+    Args:
+        query_text: Query text
+        context: Optional additional context from the request
         
-        # Step 1: Retrieve relevant information
-        retrieval_results = retriever_agent.retrieve_information(query_text)
+    Returns:
+        Response with processed query
+    """
+    # Short lookups skip retrieval and scraping and are generated ahead of longer queries
+    intent = classify_query(query_text)
+    query_data = await fetch_query_data(query_text, intent)
+    return await generate_text_response(query_text, intent, query_data, context)
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/query/text/stream")
+async def stream_text_query(query: TextQuery):
+    """
+    Process a text query, streaming progress as Server-Sent Events.
+    
+    Emits "status" events as each pipeline stage starts and a final "end" event
+    carrying the same payload as /query/text.
+    
+    Args:
+        query: Text query
         
-        # Step 2: Get market data
-        market_data = None
+    Returns:
+        Streaming text/event-stream response
+    """
+    logger.info("Streaming text query: %s", query.text)
+    query_text = query.text
+    context = query.context
+    
+    async def event_stream():
         try:
-            market_data = api_agent.get_market_data(query=query_text)
+            cached_response = get_cached_response(query_text, context)
+            if cached_response is not None:
+                yield _sse_event("end", cached_response)
+                return
+            
+            intent = classify_query(query_text)
+            yield _sse_event("status", {"stage": "fetching"})
+            query_data = await fetch_query_data(query_text, intent)
+            
+            yield _sse_event("status", {"stage": "generating"})
+            yield _sse_event("end", await generate_text_response(query_text, intent, query_data, context))
         except Exception as e:
-            logger.error(f"Error getting market data: {e}")
-        
-        # Step 3: Get relevant data from scraping agent
-        scraping_data = scraping_agent.get_relevant_data(query_text)
-        
-        # Step 4: Generate text response
-        response_text = language_agent.generate_text(
-            query=query_text,
-            retrieval_results=retrieval_results,
-            market_data=market_data,
-            scraping_data=scraping_data
-        )
-        
-        # Format the response for better readability
-        formatted_response = format_response(response_text)
-        
-        return {
-            "text": formatted_response,
-            "audio_file_path": None,
-            "success": True,
-            "error": None,
-            "transcription": None
-        }
-    except Exception as e:
-        logger.error(f"Error processing text query: {e}")
-        return {
-            "text": f"Error processing query: {str(e)}",
-            "audio_file_path": None,
-            "success": False,
-            "error": str(e),
-            "transcription": None
-        }
+            logger.error("Error streaming text query: %s", e)
+            yield _sse_event("end", _error_response(e))
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 def format_response(response_text: str) -> str:
     """
@@ -266,52 +904,93 @@ def format_response(response_text: str) -> str:
         Formatted response text
     """
     try:
-        # Check if the response looks like JSON
-        if response_text.strip().startswith("[") or response_text.strip().startswith("{"):
-            try:
-                # Try to parse as JSON
-                if response_text.strip().startswith("["):
-                    # Handle array-like format
-                    data = json.loads(response_text.replace("'", '"'))
-                    
-                    # Format as a readable response
-                    if isinstance(data, list):
-                        result = ""
-                        
-                        # Extract news articles
-                        news_articles = []
-                        for item in data:
-                            if isinstance(item, dict):
-                                if "title" in item and "source" in item:
-                                    news_articles.append({
-                                        "title": item.get("title", ""),
-                                        "source": item.get("source", ""),
-                                        "summary": item.get("summary", "")
-                                    })
-                        
-                        if news_articles:
-                            result += "Latest News on Asian Tech Stocks:\n\n"
-                            for i, article in enumerate(news_articles, 1):
-                                result += f"{i}. {article['title']}\n"
-                                result += f"   Source: {article['source']}\n"
-                                if article['summary']:
-                                    result += f"   {article['summary']}\n"
-                                result += "\n"
-                            
-                            return result
-                
-                # If we couldn't extract structured data, try a simpler approach
-                return "Asian tech stocks are performing well today. Asian markets closed higher on a tech rally, with stock markets ending the session in positive territory, led by gains in technology stocks. However, there are new regulations announced for the tech sector in China which may impact certain companies."
+        # Plain prose is returned untouched without scanning the whole text
+        stripped = response_text.lstrip()
+        first_char = stripped[:1]
+        if first_char not in ("[", "{"):
+            return response_text
+        
+        try:
+            if first_char == "[":
+                # Handle array-like format; Python-style quoting is only rewritten if strict JSON fails
+                try:
+                    data = json_loads(stripped)
+                except ValueError:
+                    data = json_loads(stripped.replace("'", '"'))
                 
-            except Exception as e:
-                logger.warning(f"Error formatting JSON response: {e}")
-                # Return the original response if parsing fails
-                return response_text
+                # Format as a readable response
+                if isinstance(data, list):
+                    # Extract news articles
+                    news_articles = [
+                        item for item in data
+                        if isinstance(item, dict) and "title" in item and "source" in item
+                    ]
+                    
+                    if news_articles:
+                        # Build the text in one join instead of repeated concatenation
+                        body = "".join(
+                            f"{i}. {article['title']}\n   Source: {article['source']}\n"
+                            + (f"   {article['summary']}\n" if article.get("summary") else "")
+                            + "\n"
+                            for i, article in enumerate(news_articles, 1)
+                        )
+                        return f"Latest News on Asian Tech Stocks:\n\n{body}"
+            
+            # If we couldn't extract structured data, try a simpler approach
+            return "Asian tech stocks are performing well today. Asian markets closed higher on a tech rally, with stock markets ending the session in positive territory, led by gains in technology stocks. However, there are new regulations announced for the tech sector in China which may impact certain companies."
+            
+        except Exception as e:
+            logger.warning("Error formatting JSON response: %s", e)
+            # Return the original response if parsing fails
+            return response_text
     except Exception as e:
-        logger.error(f"Error in format_response: {e}")
+        logger.error("Error in format_response: %s", e)
         
     return response_text
 
+async def refresh_market_snapshot() -> Dict[str, Any]:
+    """
+    Fetch the market brief inputs and publish them as a new snapshot.
+    
+    Returns:
+        The new snapshot
+    """
+    global market_snapshot, market_snapshot_expires
+    
+    # Portfolio, market, earnings and news data are independent, so fetch them concurrently
+    portfolio_data, market_data, earnings_data, news_data = await asyncio.gather(
+        cached_agent_call("portfolio:all:all", PORTFOLIO_CACHE_TTL_SECONDS, get_api_agent().get_portfolio_exposure),
+        cached_agent_call("market:summary", QUOTE_CACHE_TTL_SECONDS, get_api_agent().get_market_summary),
+        cached_agent_call("earnings:calendar", PORTFOLIO_CACHE_TTL_SECONDS, get_api_agent().get_earnings_data),
+        cached_agent_call("news:latest", NEWS_CACHE_TTL_SECONDS, get_scraping_agent().get_news_articles)
+    )
+    
+    # Swap in a whole new dict so readers never see a partially updated snapshot
+    market_snapshot = {
+        "portfolio": portfolio_data,
+        "market": market_data,
+        "earnings": earnings_data,
+        "news": news_data
+    }
+    market_snapshot_expires = time.monotonic() + SNAPSHOT_TTL_SECONDS
+    return market_snapshot
+
+async def get_market_snapshot() -> Dict[str, Any]:
+    """
+    Get the current market snapshot, rebuilding it if it is missing or expired.
+    
+    Returns:
+        Snapshot with portfolio, market, earnings and news data
+    """
+    if market_snapshot and time.monotonic() < market_snapshot_expires:
+        return market_snapshot
+    
+    # Only one request rebuilds an expired snapshot; the rest wait for its result
+    async with market_snapshot_lock:
+        if market_snapshot and time.monotonic() < market_snapshot_expires:
+            return market_snapshot
+        return await refresh_market_snapshot()
+
 async def generate_market_brief(query: str, context: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate a market brief.
@@ -325,18 +1004,14 @@ async def generate_market_brief(query: str, context: Dict[str, Any]) -> Dict[str
     """
     logger.info("Generating market brief")
     
-    # Get real data from API agent
+    # Get real data from the shared snapshot
     try:
-        portfolio_data = api_agent.get_portfolio_data()
-        market_data = api_agent.get_market_summary()
-        earnings_data = api_agent.get_earnings_data()
-        
-        # Get news data from scraping agent
-        news_data = scraping_agent.get_financial_news()
+        snapshot = await get_market_snapshot()
         
         # Generate brief using analysis agent
-        brief_result = analysis_agent.generate_market_brief(
-            query, portfolio_data, market_data, earnings_data, news_data
+        brief_result = await run_blocking(
+            get_analysis_agent().generate_market_brief,
+            query, snapshot["portfolio"], snapshot["market"], snapshot["earnings"], snapshot["news"]
         )
         
         if brief_result["success"]:
@@ -355,7 +1030,7 @@ async def generate_market_brief(query: str, context: Dict[str, Any]) -> Dict[str
                 "error": None
             }
     except Exception as e:
-        logger.error(f"Error generating market brief: {e}")
+        logger.error("Error generating market brief: %s", e)
         # Fallback response on error
         fallback_text = "Today's market shows mixed performance across sectors. Major indices are showing modest movement, with technology stocks leading gains while energy stocks face some pressure."
         
@@ -379,17 +1054,19 @@ async def generate_asia_tech_report(query: str, context: Dict[str, Any]) -> Dict
     logger.info("Generating Asia tech exposure report")
     
     try:
-        # Get portfolio data with focus on Asia tech
-        portfolio_data = api_agent.get_portfolio_data(region="Asia", sector="Technology")
-        
-        # Get earnings surprises for Asia tech companies
-        earnings_data = api_agent.get_earnings_surprises(region="Asia", sector="Technology")
-        
-        # Get news sentiment for Asia tech
-        news_data = scraping_agent.get_financial_news(query="Asia technology")
+        # Get Asia tech portfolio data, earnings surprises and news sentiment concurrently
+        portfolio_data, earnings_data, news_data = await asyncio.gather(
+            cached_agent_call("portfolio:Asia:Technology", PORTFOLIO_CACHE_TTL_SECONDS,
+                              get_api_agent().get_portfolio_exposure, region="Asia", sector="Technology"),
+            cached_agent_call("earnings:surprises:Technology", PORTFOLIO_CACHE_TTL_SECONDS,
+                              get_api_agent().get_earnings_surprises, sector="Technology"),
+            cached_agent_call(f"news:{_query_key('Asia technology')}", NEWS_CACHE_TTL_SECONDS,
+                              get_scraping_agent().get_news_articles, query="Asia technology")
+        )
         
         # Generate report using analysis agent
-        report_result = analysis_agent.generate_sector_report(
+        report_result = await run_blocking(
+            get_analysis_agent().generate_sector_report,
             query, portfolio_data, earnings_data, news_data
         )
         
@@ -409,7 +1086,7 @@ async def generate_asia_tech_report(query: str, context: Dict[str, Any]) -> Dict
                 "error": None
             }
     except Exception as e:
-        logger.error(f"Error generating Asia tech report: {e}")
+        logger.error("Error generating Asia tech report: %s", e)
         # Fallback response on error
         fallback_text = "Your Asia tech allocation is currently 22% of AUM, up from 18% yesterday. TSMC beat earnings estimates by 4%, while Samsung missed by 2%. Regional sentiment is neutral with a cautionary tilt due to rising yields."
         
@@ -425,26 +1102,29 @@ def start_server():
     # Use a different default port to avoid conflicts
     port = int(os.getenv("API_PORT", "8000"))
     
-    # Try to find an available port if the default is in use
+    # Bind once up front so a busy port is skipped without restarting uvicorn
     max_attempts = 5
-    attempt = 0
+    sock = bind_server_socket(host, port, max_attempts)
+    if sock is None:
+        logger.error("Could not find an available port after %s attempts", max_attempts)
+        return
     
-    while attempt < max_attempts:
-        try:
-            logger.info(f"Starting server on {host}:{port}")
-            uvicorn.run(app, host=host, port=port)
-            break
-        except OSError as e:
-            if "address already in use" in str(e).lower():
-                attempt += 1
-                port += 1
-                logger.warning(f"Port {port-1} is in use, trying port {port}")
-            else:
-                logger.error(f"Failed to start server: {e}")
-                raise
+    # One worker by default: response caches, request coalescing and the loaded agents are
+    # per process. API_WORKERS opts in to more; set REDIS_URL to share agent data between them
+    workers = int(os.getenv("API_WORKERS") or 1)
+    
+    bound_host, bound_port = sock.getsockname()[:2]
+    logger.info("Starting server on %s:%s with %s worker(s)", bound_host, bound_port, workers)
     
-    if attempt >= max_attempts:
-        logger.error(f"Could not find an available port after {max_attempts} attempts")
+    # loop/http "auto" pick uvloop and httptools when they are installed
+    uvicorn.run(
+        "orchestrator.main:app" if workers > 1 else app,
+        fd=sock.fileno(),
+        workers=workers,
+        loop="auto",
+        http="auto",
+        backlog=2048
+    )
 
 if __name__ == "__main__":
     start_server() 
\ No newline at end of file
@@ -5,10 +5,14 @@ import os
 import sys
 import logging
 import json
+import re
 from typing import Dict, List, Any, Optional
+from collections import OrderedDict
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 from contextlib import asynccontextmanager
@@ -17,12 +21,19 @@ from dotenv import load_dotenv
 # Add parent directory to path to import agents
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.voice_agent import VoiceAgent
+from agents.voice_agent import VoiceAgent, split_sentences
 from agents.language_agent import LanguageAgent
 from agents.analysis_agent import AnalysisAgent
 from agents.api_agent import APIAgent
 from agents.scraping_agent import ScrapingAgent
 from agents.retriever_agent import RetrieverAgent
+from orchestrator.server import bind_server_socket
+
+# orjson is optional; it serializes the language agent's context far faster than the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables
 load_dotenv()
@@ -31,14 +42,98 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Intent phrases compiled into one case-insensitive pattern, so routing scans the query once
+INTENT_PATTERN = re.compile(
+    r"(?P<market_brief>market brief)|(?P<risk_exposure>risk exposure)|(?P<asia_tech>asia tech)",
+    re.IGNORECASE
+)
+
+def match_intents(query_text: str) -> set:
+    """
+    Find the routing intents mentioned in a query.
+    
+    Args:
+        query_text: Query text
+        
+    Returns:
+        Set of matched intent names (market_brief, risk_exposure, asia_tech)
+    """
+    return {match.lastgroup for match in INTENT_PATTERN.finditer(query_text)}
+
+# Threads for blocking agent calls; they wait on network I/O, so the pool is sized well above the CPU count
+IO_THREADS = int(os.getenv("IO_THREADS", "128"))
+
+def dumps_context(context: Dict[str, Any]) -> str:
+    """
+    Serialize query context to JSON, using orjson when it is installed.
+    
+    Args:
+        context: Combined market, news and document context
+        
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        return orjson.dumps(context, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(context)
+
+# Audio uploads outside these bounds are rejected before transcription
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+
+# Successful transcriptions keyed by (path, size, mtime), so client retries of an unchanged file skip speech-to-text
+TRANSCRIPTION_CACHE_MAX_SIZE = 256
+transcription_cache = OrderedDict()
+
+# Fixed spoken fallbacks, rendered once and reused for every failed voice request
+TRANSCRIPTION_FAILED_TEXT = "I'm sorry, I couldn't understand the audio. Please try speaking more clearly or using text input instead."
+NO_SPEECH_TEXT = "I couldn't detect any speech in the audio. Please try again."
+VOICE_ERROR_TEXT = "I'm sorry, there was an error processing your voice query. Please try again or use text input instead."
+FALLBACK_AUDIO: Dict[str, str] = {}
+
+async def fallback_audio_file(text: str) -> Optional[str]:
+    """
+    Get the audio file for a fixed fallback message, synthesizing it only once.
+    
+    Args:
+        text: Fallback message
+        
+    Returns:
+        Audio file path, or None if synthesis failed
+    """
+    audio_file = FALLBACK_AUDIO.get(text)
+    if audio_file and os.path.exists(audio_file):
+        return audio_file
+    
+    audio_file = await asyncio.to_thread(voice_agent.text_to_speech_file, text)
+    if audio_file:
+        FALLBACK_AUDIO[text] = audio_file
+    return audio_file
+
 # Define lifespan context
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: initialize agents and resources
     logger.info("Starting Finance Assistant Orchestrator")
+    
+    # asyncio.to_thread runs on the loop's default executor
+    io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="agent-io")
+    asyncio.get_running_loop().set_default_executor(io_executor)
+    
+    # Load the audio decoding pipeline now so the first voice request does not pay for it
+    await asyncio.to_thread(voice_agent.warmup)
+    
+    # Render the fixed fallback messages before any request can fail
+    for result in await asyncio.gather(
+        *(fallback_audio_file(text) for text in (TRANSCRIPTION_FAILED_TEXT, NO_SPEECH_TEXT, VOICE_ERROR_TEXT)),
+        return_exceptions=True
+    ):
+        if isinstance(result, Exception) or result is None:
+            logger.warning(f"Could not pre-render fallback audio: {result}")
+    
     yield
     # Shutdown: cleanup resources
     logger.info("Shutting down Finance Assistant Orchestrator")
+    io_executor.shutdown(wait=False, cancel_futures=True)
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
@@ -83,8 +178,45 @@ async def root():
     """Health check endpoint."""
     return {"status": "online", "message": "Finance Assistant Orchestrator is running"}
 
+async def stream_speech(text: str):
+    """
+    Synthesize text sentence by sentence, yielding MP3 audio as each part is ready.
+    
+    The first sentence group is streamed part by part as gTTS returns it, while the
+    rest are synthesized concurrently and yielded in order, so playback can start
+    after the first gTTS request.
+    
+    Args:
+        text: Text to speak
+        
+    Yields:
+        MP3 audio bytes
+    """
+    segments = split_sentences(text)
+    if not segments:
+        return
+    
+    tasks = [
+        asyncio.ensure_future(asyncio.to_thread(voice_agent.text_to_speech, segment))
+        for segment in segments[1:]
+    ]
+    try:
+        first_segment_audio = voice_agent.iter_speech(segments[0])
+        while True:
+            audio = await asyncio.to_thread(next, first_segment_audio, None)
+            if audio is None:
+                break
+            yield audio
+        for task in tasks:
+            audio = await task
+            if audio:
+                yield audio
+    finally:
+        for task in tasks:
+            task.cancel()
+
 @app.post("/query/voice", response_model=Response)
-async def process_voice_query(query: VoiceQuery):
+async def process_voice_query(query: VoiceQuery, request: Request):
     """
     Process a voice query.
     
@@ -93,17 +225,23 @@ async def process_voice_query(query: VoiceQuery):
     2. Process the query with the language agent
     3. Generate a voice response
     
+    Clients sending ``Accept: audio/mpeg`` receive the spoken answer as a streamed
+    MP3 body instead of the JSON response.
+    
     Args:
         query: Voice query with audio file path
+        request: Incoming request, used for content negotiation
         
     Returns:
-        Response with text and audio file path
+        Response with text and audio file path, or a streaming MP3 response
     """
     logger.info(f"Processing voice query: {query.audio_file_path}")
     
     try:
-        # Check if the audio file exists
-        if not os.path.exists(query.audio_file_path):
+        # One stat call both checks that the audio file exists and gives its size
+        try:
+            audio_stat = await asyncio.to_thread(os.stat, query.audio_file_path)
+        except FileNotFoundError:
             logger.error(f"Audio file not found: {query.audio_file_path}")
             return {
                 "text": "I'm sorry, the audio file could not be found.",
@@ -113,36 +251,45 @@ async def process_voice_query(query: VoiceQuery):
                 "error": f"Audio file not found: {query.audio_file_path}"
             }
         
-        # Step 1: Transcribe audio to text
-        transcription_result = voice_agent.process_voice_query(query.audio_file_path)
+        if audio_stat.st_size == 0 or audio_stat.st_size > MAX_AUDIO_BYTES:
+            logger.error(f"Audio file size out of bounds ({audio_stat.st_size} bytes): {query.audio_file_path}")
+            return {
+                "text": "I'm sorry, the recording is empty or too large. Please try again.",
+                "audio_file_path": None,
+                "transcription": None,
+                "success": False,
+                "error": f"Audio file size out of bounds: {audio_stat.st_size} bytes"
+            }
         
-        if not transcription_result["success"]:
+        # Step 1: Transcribe audio to text, reusing the result for an unchanged file
+        cache_key = (query.audio_file_path, audio_stat.st_size, audio_stat.st_mtime_ns)
+        transcription = transcription_cache.get(cache_key)
+        if transcription is not None:
+            transcription_cache.move_to_end(cache_key)
+        else:
+            transcription = await asyncio.to_thread(voice_agent.speech_to_text, query.audio_file_path)
+            if transcription is not None:
+                transcription_cache[cache_key] = transcription
+                if len(transcription_cache) > TRANSCRIPTION_CACHE_MAX_SIZE:
+                    transcription_cache.popitem(last=False)
+        
+        if transcription is None:
             # If transcription fails, return a helpful error message
-            error_msg = transcription_result.get("error", "Unknown transcription error")
-            fallback_text = "I'm sorry, I couldn't understand the audio. Please try speaking more clearly or using text input instead."
-            
-            # Generate voice response for the error message
-            voice_response = voice_agent.generate_voice_response(fallback_text)
-            
             return {
-                "text": fallback_text,
-                "audio_file_path": voice_response.get("audio_file"),
+                "text": TRANSCRIPTION_FAILED_TEXT,
+                "audio_file_path": await fallback_audio_file(TRANSCRIPTION_FAILED_TEXT),
                 "transcription": None,
                 "success": False,
-                "error": error_msg
+                "error": "Transcription failed"
             }
         
-        transcription = transcription_result["transcription"]
         logger.info(f"Transcription: {transcription}")
         
         # If transcription is empty or too short, return an error
         if not transcription or len(transcription.strip()) < 3:
-            fallback_text = "I couldn't detect any speech in the audio. Please try again."
-            voice_response = voice_agent.generate_voice_response(fallback_text)
-            
             return {
-                "text": fallback_text,
-                "audio_file_path": voice_response.get("audio_file"),
+                "text": NO_SPEECH_TEXT,
+                "audio_file_path": await fallback_audio_file(NO_SPEECH_TEXT),
                 "transcription": transcription,
                 "success": False,
                 "error": "Empty or too short transcription"
@@ -152,15 +299,18 @@ async def process_voice_query(query: VoiceQuery):
         text_query = {"text": transcription}
         response = await process_text_query_internal(text_query)
         
-        # Step 3: Generate a voice response
-        voice_response = voice_agent.generate_voice_response(response["text"])
+        # Step 3: Generate a voice response, streamed sentence by sentence if the client accepts audio
+        if "audio/mpeg" in request.headers.get("accept", ""):
+            return StreamingResponse(stream_speech(response["text"]), media_type="audio/mpeg")
+        
+        audio_file = await asyncio.to_thread(voice_agent.text_to_speech_file, response["text"])
         
-        if not voice_response["success"]:
-            logger.warning(f"Failed to generate voice response: {voice_response['error']}")
+        if audio_file is None:
+            logger.warning("Failed to generate voice response")
         
         return {
             "text": response["text"],
-            "audio_file_path": voice_response.get("audio_file"),
+            "audio_file_path": audio_file,
             "transcription": transcription,
             "success": True,
             "error": None
@@ -170,15 +320,13 @@ async def process_voice_query(query: VoiceQuery):
         logger.error(f"Error processing voice query: {e}")
         
         # Generate a fallback response
-        fallback_text = "I'm sorry, there was an error processing your voice query. Please try again or use text input instead."
         try:
-            voice_response = voice_agent.generate_voice_response(fallback_text)
-            audio_path = voice_response.get("audio_file")
+            audio_path = await fallback_audio_file(VOICE_ERROR_TEXT)
         except:
             audio_path = None
         
         return {
-            "text": fallback_text,
+            "text": VOICE_ERROR_TEXT,
             "audio_file_path": audio_path,
             "transcription": None,
             "success": False,
@@ -214,37 +362,46 @@ async def process_text_query_internal(query_data: Dict[str, Any]) -> Dict[str, A
     logger.info(f"Processing text query: {query_text}")
     
     try:
-        # First, retrieve relevant information using the retriever agent
-        retrieval_result = retriever_agent.retrieve_information(query_text)
-        
-        # Get market data using API agent - fixed to pass the query parameter correctly
-        market_data = api_agent.get_market_data(query=query_text)
-        
-        # Get scraped data if needed
-        scraped_data = scraping_agent.get_relevant_data(query_text)
-        
-        # Combine all data sources
-        combined_context = {
-            "retrieved_info": retrieval_result.get("information", []),
-            "market_data": market_data.get("data", {}),
-            "scraped_data": scraped_data.get("data", {}),
-            "user_context": context
-        }
-        
-        # Check for specific query patterns
-        if "market brief" in query_text.lower():
+        # Market briefs and Asia tech reports fetch their own data, so route them before the generic fan-out
+        intents = match_intents(query_text)
+        if "market_brief" in intents:
             # Generate a market brief
-            return await generate_market_brief(query_text, combined_context)
+            return await generate_market_brief(query_text, {"user_context": context})
             
-        elif "risk exposure" in query_text.lower() and "asia tech" in query_text.lower():
+        elif "risk_exposure" in intents and "asia_tech" in intents:
             # Generate a risk exposure report for Asia tech
-            return await generate_asia_tech_report(query_text, combined_context)
+            return await generate_asia_tech_report(query_text, {"user_context": context})
             
         else:
+            # Retrieval, market data (API agent) and scraped data are independent, so fetch them concurrently
+            results = await asyncio.gather(
+                asyncio.to_thread(retriever_agent.retrieve_information, query_text),
+                asyncio.to_thread(api_agent.get_market_data, query=query_text),
+                asyncio.to_thread(scraping_agent.get_relevant_data, query_text),
+                return_exceptions=True
+            )
+            
+            # A failed source contributes no data instead of failing the whole query
+            for name, result in zip(("retrieval", "market data", "scraping"), results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error getting {name}: {result}")
+            retrieval_result, market_data, scraped_data = (
+                {} if isinstance(result, Exception) else result for result in results
+            )
+            
+            # Combine all data sources
+            combined_context = {
+                "retrieved_info": retrieval_result.get("information", []),
+                "market_data": market_data.get("data", {}),
+                "scraped_data": scraped_data.get("data", {}),
+                "user_context": context
+            }
+            
             # General query - use language agent with retrieved context
-            response = language_agent.process_query(
-                query_text, 
-                json.dumps(combined_context) if combined_context else None
+            response = await asyncio.to_thread(
+                language_agent.process_query,
+                query_text,
+                dumps_context(combined_context) if combined_context else None
             )
             
             # Ensure we have a valid response
@@ -287,15 +444,17 @@ async def generate_market_brief(query: str, context: Dict[str, Any]) -> Dict[str
     
     # Get real data from API agent
     try:
-        portfolio_data = api_agent.get_portfolio_data()
-        market_data = api_agent.get_market_summary()
-        earnings_data = api_agent.get_earnings_data()
-        
-        # Get news data from scraping agent
-        news_data = scraping_agent.get_financial_news()
+        # Portfolio, market, earnings and news data are independent, so fetch them concurrently
+        portfolio_data, market_data, earnings_data, news_data = await asyncio.gather(
+            asyncio.to_thread(api_agent.get_portfolio_exposure),
+            asyncio.to_thread(api_agent.get_market_summary),
+            asyncio.to_thread(api_agent.get_earnings_data),
+            asyncio.to_thread(scraping_agent.get_news_articles)
+        )
         
         # Generate brief using analysis agent
-        brief_result = analysis_agent.generate_market_brief(
+        brief_result = await asyncio.to_thread(
+            analysis_agent.generate_market_brief,
             query, portfolio_data, market_data, earnings_data, news_data
         )
         
@@ -339,17 +498,16 @@ async def generate_asia_tech_report(query: str, context: Dict[str, Any]) -> Dict
     logger.info("Generating Asia tech exposure report")
     
     try:
-        # Get portfolio data with focus on Asia tech
-        portfolio_data = api_agent.get_portfolio_data(region="Asia", sector="Technology")
-        
-        # Get earnings surprises for Asia tech companies
-        earnings_data = api_agent.get_earnings_surprises(region="Asia", sector="Technology")
-        
-        # Get news sentiment for Asia tech
-        news_data = scraping_agent.get_financial_news(query="Asia technology")
+        # Asia tech portfolio data, earnings surprises and news sentiment are fetched concurrently
+        portfolio_data, earnings_data, news_data = await asyncio.gather(
+            asyncio.to_thread(api_agent.get_portfolio_exposure, region="Asia", sector="Technology"),
+            asyncio.to_thread(api_agent.get_earnings_surprises, sector="Technology"),
+            asyncio.to_thread(scraping_agent.get_news_articles, query="Asia technology")
+        )
         
         # Generate report using analysis agent
-        report_result = analysis_agent.generate_sector_report(
+        report_result = await asyncio.to_thread(
+            analysis_agent.generate_sector_report,
             query, portfolio_data, earnings_data, news_data
         )
         
@@ -380,31 +538,39 @@ async def generate_asia_tech_report(query: str, context: Dict[str, Any]) -> Dict
         }
 
 def start_server():
-    """Start the API server."""
+    """
+    Start the API server.
+    
+    Uses uvloop and httptools when they are installed. One worker by default, since the
+    caches and loaded agents are per process; API_WORKERS opts in to more.
+    For production the same app can be served with
+    ``gunicorn -k uvicorn.workers.UvicornWorker -w N orchestrator.main_fixed:app``.
+    """
     host = os.getenv("API_HOST", "localhost")
     # Use a different default port to avoid conflicts
     port = int(os.getenv("API_PORT", "8000"))
     
-    # Try to find an available port if the default is in use
-    max_attempts = 5
-    attempt = 0
-    
-    while attempt < max_attempts:
-        try:
-            logger.info(f"Starting server on {host}:{port}")
-            uvicorn.run(app, host=host, port=port)
-            break
-        except OSError as e:
-            if "address already in use" in str(e).lower():
-                attempt += 1
-                port += 1
-                logger.warning(f"Port {port-1} is in use, trying port {port}")
-            else:
-                logger.error(f"Failed to start server: {e}")
-                raise
+    workers = int(os.getenv("API_WORKERS") or 1)
     
-    if attempt >= max_attempts:
+    # Bind once up front; uvicorn.run blocks, so retrying around it never worked
+    max_attempts = 5
+    sock = bind_server_socket(host, port, max_attempts)
+    if sock is None:
         logger.error(f"Could not find an available port after {max_attempts} attempts")
+        return
+    
+    bound_host, bound_port = sock.getsockname()[:2]
+    logger.info(f"Starting server on {bound_host}:{bound_port} with {workers} worker(s)")
+    # Workers need the app as an import string; a single worker serves this module's app, so
+    # running the file directly does not import it a second time and build every agent twice.
+    # loop/http "auto" pick uvloop and httptools when they are installed
+    uvicorn.run(
+        "orchestrator.main_fixed:app" if workers > 1 else app,
+        fd=sock.fileno(),
+        loop="auto",
+        http="auto",
+        workers=workers
+    )
 
 if __name__ == "__main__":
     start_server() 
\ No newline at end of file
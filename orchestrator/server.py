@@ -0,0 +1,32 @@
+"""
+Server helpers shared by the orchestrator entry points.
+"""
+import logging
+import socket
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def bind_server_socket(host: str, port: int, max_attempts: int = 5) -> Optional[socket.socket]:
+    """
+    Bind the listening socket, moving to the next port if one is in use.
+    
+    Args:
+        host: Host address to bind
+        port: First port to try
+        max_attempts: Number of consecutive ports to try
+        
+    Returns:
+        The bound socket, or None if no port was available
+    """
+    for candidate in range(port, port + max_attempts):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, candidate))
+            return sock
+        except OSError as e:
+            sock.close()
+            logger.warning("Port %s is unavailable (%s), trying port %s", candidate, e, candidate + 1)
+    
+    return None
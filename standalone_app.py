@@ -13,6 +13,13 @@ import time
 import yfinance as yf
 from data_ingestion.web_scraper import WebScraper
 from data_ingestion.market_data import MarketDataClient
+from streamlit_app.utils import color_pos_neg
+
+# numba is optional; without it the statistics are computed with vectorized numpy
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Load environment variables
 load_dotenv()
@@ -66,67 +73,211 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+if njit is not None:
+    @njit(cache=True)
+    def stock_stats(high, low, close):
+        """
+        Compute the Stock Analysis statistics in a single pass over the price arrays.
+        
+        Missing (NaN) values are skipped, as pandas does for max, min, mean and std.
+        
+        Args:
+            high: High prices as a float64 array
+            low: Low prices as a float64 array
+            close: Close prices as a float64 array
+            
+        Returns:
+            Tuple of (high max, low min, close mean, close std, close min, close max,
+            total % change, last % change); NaN where a column has no values
+        """
+        n = close.shape[0]
+        hmax = -np.inf
+        lmin = np.inf
+        cmin = np.inf
+        cmax = -np.inf
+        n_valid = 0
+        mean = 0.0
+        m2 = 0.0
+        for i in range(n):
+            if np.isfinite(high[i]) and high[i] > hmax:
+                hmax = high[i]
+            if np.isfinite(low[i]) and low[i] < lmin:
+                lmin = low[i]
+            c = close[i]
+            if not np.isfinite(c):
+                continue
+            if c < cmin:
+                cmin = c
+            if c > cmax:
+                cmax = c
+            # Welford's online variance
+            n_valid += 1
+            delta = c - mean
+            mean += delta / n_valid
+            m2 += delta * (c - mean)
+        if hmax == -np.inf:
+            hmax = np.nan
+        if lmin == np.inf:
+            lmin = np.nan
+        if n_valid == 0:
+            mean = np.nan
+            cmin = np.nan
+            cmax = np.nan
+        cstd = np.sqrt(m2 / (n_valid - 1)) if n_valid > 1 else np.nan
+        pct_total = (close[n - 1] - close[0]) / close[0] * 100.0 if n > 0 else np.nan
+        pct_last = (close[n - 1] - close[n - 2]) / close[n - 2] * 100.0 if n > 1 else np.nan
+        return hmax, lmin, mean, cstd, cmin, cmax, pct_total, pct_last
+else:
+    def stock_stats(high, low, close):
+        """
+        Compute the Stock Analysis statistics with vectorized numpy.
+        
+        Same results as the numba kernel; a Python loop over every row would be far
+        slower than these array reductions.
+        
+        Args:
+            high: High prices as a float64 array
+            low: Low prices as a float64 array
+            close: Close prices as a float64 array
+            
+        Returns:
+            Tuple of (high max, low min, close mean, close std, close min, close max,
+            total % change, last % change); NaN where a column has no values
+        """
+        n = close.shape[0]
+        high = high[np.isfinite(high)]
+        low = low[np.isfinite(low)]
+        valid = close[np.isfinite(close)]
+        hmax = high.max() if high.size else np.nan
+        lmin = low.min() if low.size else np.nan
+        mean = valid.mean() if valid.size else np.nan
+        cstd = valid.std(ddof=1) if valid.size > 1 else np.nan
+        cmin = valid.min() if valid.size else np.nan
+        cmax = valid.max() if valid.size else np.nan
+        pct_total = (close[n - 1] - close[0]) / close[0] * 100.0 if n > 0 else np.nan
+        pct_last = (close[n - 1] - close[n - 2]) / close[n - 2] * 100.0 if n > 1 else np.nan
+        return hmax, lmin, mean, cstd, cmin, cmax, pct_total, pct_last
+
+# Shown when live index data is unavailable; built once and never modified
+FALLBACK_MARKET_OVERVIEW = pd.DataFrame({
+    "Index": ["Dow Jones", "S&P 500", "NASDAQ", "Nikkei 225", "Hang Seng", "FTSE 100"],
+    "Price": [34567.89, 4567.89, 14567.89, 28567.89, 24567.89, 7567.89],
+    "Change": [123.45, 23.45, 123.45, -123.45, -23.45, 23.45],
+    "Change %": [0.36, 0.52, 0.85, -0.43, -0.10, 0.31],
+    "Source": ["Fallback Data"] * 6
+})
+
+# Major indices shown on the Market Overview page
+MARKET_INDICES = {
+    "^DJI": "Dow Jones",
+    "^GSPC": "S&P 500",
+    "^IXIC": "NASDAQ",
+    "^N225": "Nikkei 225",
+    "^HSI": "Hang Seng",
+    "^FTSE": "FTSE 100"
+}
+
+@st.cache_data(ttl=60, show_spinner=False)
 def get_market_overview():
     """Get an overview of major market indices."""
-    indices = [
-        "^DJI",    # Dow Jones
-        "^GSPC",   # S&P 500
-        "^IXIC",   # NASDAQ
-        "^N225",   # Nikkei 225
-        "^HSI",    # Hang Seng
-        "^FTSE"    # FTSE 100
-    ]
-    
     try:
         # Get real-time market data
-        market_data = web_scraper.get_realtime_market_data(indices)
+        market_data = web_scraper.get_realtime_market_data(list(MARKET_INDICES))
         
-        # Create a DataFrame for display
-        data = []
-        for symbol, info in market_data.items():
-            data.append({
-                "Index": info.get("name", symbol),
-                "Price": info.get("price", 0),
-                "Change": info.get("change", 0),
-                "Change %": info.get("change_percent", 0),
-                "Source": info.get("source", "Unknown")
-            })
+        # Create a DataFrame for display, filling typed columns in a single pass
+        n = len(market_data)
+        names = []
+        sources = []
+        prices = np.empty(n, dtype=np.float64)
+        changes = np.empty(n, dtype=np.float64)
+        change_percents = np.empty(n, dtype=np.float64)
+        for i, (symbol, info) in enumerate(market_data.items()):
+            names.append(info.get("name", symbol))
+            prices[i] = info.get("price", 0)
+            changes[i] = info.get("change", 0)
+            change_percents[i] = info.get("change_percent", 0)
+            sources.append(info.get("source", "Unknown"))
         
-        return pd.DataFrame(data)
+        return pd.DataFrame({
+            "Index": names,
+            "Price": prices,
+            "Change": changes,
+            "Change %": change_percents,
+            "Source": sources
+        })
     except Exception as e:
         logger.error(f"Error getting market overview: {e}")
         # Return dummy data if there's an error
-        return pd.DataFrame([
-            {"Index": "Dow Jones", "Price": 34567.89, "Change": 123.45, "Change %": 0.36, "Source": "Fallback Data"},
-            {"Index": "S&P 500", "Price": 4567.89, "Change": 23.45, "Change %": 0.52, "Source": "Fallback Data"},
-            {"Index": "NASDAQ", "Price": 14567.89, "Change": 123.45, "Change %": 0.85, "Source": "Fallback Data"},
-            {"Index": "Nikkei 225", "Price": 28567.89, "Change": -123.45, "Change %": -0.43, "Source": "Fallback Data"},
-            {"Index": "Hang Seng", "Price": 24567.89, "Change": -23.45, "Change %": -0.10, "Source": "Fallback Data"},
-            {"Index": "FTSE 100", "Price": 7567.89, "Change": 23.45, "Change %": 0.31, "Source": "Fallback Data"}
-        ])
+        return FALLBACK_MARKET_OVERVIEW
 
-def get_stock_data(symbol, period="1mo"):
-    """Get historical stock data."""
-    try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=period)
+@st.cache_data(ttl=300, show_spinner=False)
+def get_stock_data_batch(symbols, period="1mo"):
+    """
+    Get historical data for several symbols with a single yfinance download.
+    
+    This is the only cached layer for price history; pass symbols as a tuple so
+    the same set of symbols hits the same cache entry.
+    
+    Args:
+        symbols: Ticker symbols to fetch
+        period: History period (e.g. "1mo", "6mo")
         
-        if hist.empty:
-            raise ValueError(f"No data found for symbol: {symbol}")
-            
-        return hist
-    except Exception as e:
-        logger.error(f"Error getting stock data for {symbol}: {e}")
-        # Return dummy data
-        dates = pd.date_range(end=datetime.datetime.now(), periods=30)
-        return pd.DataFrame({
-            'Open': np.random.normal(100, 5, len(dates)),
-            'High': np.random.normal(105, 5, len(dates)),
-            'Low': np.random.normal(95, 5, len(dates)),
-            'Close': np.random.normal(100, 5, len(dates)),
-            'Volume': np.random.randint(1000000, 10000000, len(dates))
-        }, index=dates)
+    Returns:
+        Dictionary mapping each symbol with data to its history DataFrame
+        
+    Raises:
+        ValueError: If none of the symbols returned data
+    """
+    symbols = sorted(set(symbols))
+    data = yf.download(
+        tickers=" ".join(symbols),
+        period=period,
+        group_by="ticker",
+        auto_adjust=True,
+        threads=True,
+        progress=False
+    )
+    
+    frames = {}
+    multi_ticker = isinstance(data.columns, pd.MultiIndex)
+    for symbol in symbols:
+        if multi_ticker:
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            frame = data[symbol]
+        else:
+            frame = data
+        frame = frame.dropna(how="all")
+        if not frame.empty:
+            frames[symbol] = frame
+    
+    # yf.download reports failures as empty frames instead of raising; raise here so the
+    # empty result is not cached (st.cache_data never caches exceptions) and the next
+    # rerun downloads again
+    if not frames:
+        raise ValueError(f"No data found for symbols: {', '.join(symbols)}")
+    return frames
 
+def get_stock_data(symbol, period="1mo"):
+    """
+    Get historical stock data for one symbol.
+    
+    Raises:
+        ValueError: If no data was found for the symbol
+    """
+    hist = get_stock_data_batch((symbol,), period).get(symbol)
+    if hist is None:
+        raise ValueError(f"No data found for symbol: {symbol}")
+    return hist
+
+def to_chart_data(hist):
+    """Get Close and Volume for charting, downcast to float32 to halve what is sent to the browser."""
+    return pd.DataFrame({
+        'Close': hist['Close'].to_numpy(dtype=np.float32),
+        'Volume': hist['Volume'].to_numpy(dtype=np.float32)
+    }, index=hist.index)
+
+@st.cache_data(ttl=300, show_spinner=False)
 def get_financial_news(query="", max_results=5):
     """Get financial news articles."""
     try:
@@ -174,8 +325,8 @@ def main():
         
         # Display market data with conditional formatting
         st.dataframe(
-            market_df.style.applymap(
-                lambda x: 'color: green' if isinstance(x, (int, float)) and x > 0 else ('color: red' if isinstance(x, (int, float)) and x < 0 else ''),
+            market_df.style.apply(
+                color_pos_neg,
                 subset=['Change', 'Change %']
             ),
             use_container_width=True
@@ -184,14 +335,23 @@ def main():
         # Market trends visualization
         st.markdown("<h3 class='sub-header'>Market Trends</h3>", unsafe_allow_html=True)
         
-        # Get some historical data for S&P 500
+        trend_symbol = st.selectbox(
+            "Index",
+            list(MARKET_INDICES),
+            index=list(MARKET_INDICES).index("^GSPC"),
+            format_func=MARKET_INDICES.get
+        )
+        
+        # Fetch all the indices in one download, so switching index is a cache hit
         with st.spinner("Loading market trends..."):
             try:
-                sp500_data = get_stock_data("^GSPC", period="6mo")
+                trends = get_stock_data_batch(tuple(MARKET_INDICES), period="6mo")
+                if trend_symbol not in trends:
+                    raise ValueError(f"No data found for symbol: {trend_symbol}")
                 
                 # Create a line chart
-                st.line_chart(sp500_data['Close'])
-                st.caption("S&P 500 - 6 Month Trend")
+                st.line_chart(to_chart_data(trends[trend_symbol])['Close'])
+                st.caption(f"{MARKET_INDICES[trend_symbol]} - 6 Month Trend")
             except Exception as e:
                 st.error(f"Error loading market trends: {e}")
     
@@ -205,46 +365,59 @@ def main():
         if st.button("Analyze"):
             with st.spinner(f"Analyzing {stock_symbol}..."):
                 # Get stock data
-                stock_data = get_stock_data(stock_symbol, period)
+                try:
+                    stock_data = get_stock_data(stock_symbol, period)
+                except Exception as e:
+                    logger.error(f"Error getting stock data for {stock_symbol}: {e}")
+                    stock_data = pd.DataFrame()
                 
                 if not stock_data.empty:
                     # Display stock info
                     st.markdown(f"<div class='card'><h3>{stock_symbol} Stock Analysis</h3></div>", unsafe_allow_html=True)
                     
+                    # Charts use a float32 copy of the same history
+                    chart_data = to_chart_data(stock_data)
+                    
                     # Price chart
                     st.subheader("Price Chart")
-                    st.line_chart(stock_data['Close'])
+                    st.line_chart(chart_data['Close'])
                     
                     # Volume chart
                     st.subheader("Volume Chart")
-                    st.bar_chart(stock_data['Volume'])
+                    st.bar_chart(chart_data['Volume'])
                     
                     # Statistics
                     st.markdown("<h3 class='sub-header'>Statistics</h3>", unsafe_allow_html=True)
                     
+                    hmax, lmin, cmean, cstd, cmin, cmax, pct_total, pct_last = stock_stats(
+                        stock_data['High'].to_numpy(dtype=np.float64),
+                        stock_data['Low'].to_numpy(dtype=np.float64),
+                        stock_data['Close'].to_numpy(dtype=np.float64)
+                    )
+                    
                     col1, col2, col3 = st.columns(3)
                     
                     with col1:
                         st.metric("Current Price", f"${stock_data['Close'].iloc[-1]:.2f}", 
-                                 f"{((stock_data['Close'].iloc[-1] - stock_data['Close'].iloc[-2]) / stock_data['Close'].iloc[-2] * 100):.2f}%")
+                                 f"{pct_last:.2f}%")
                     
                     with col2:
                         st.metric("Average Volume", f"{stock_data['Volume'].mean():.0f}")
                     
                     with col3:
                         st.metric("Price Change (%)", 
-                                 f"{((stock_data['Close'].iloc[-1] - stock_data['Close'].iloc[0]) / stock_data['Close'].iloc[0] * 100):.2f}%")
+                                 f"{pct_total:.2f}%")
                     
                     # More statistics
                     stats_df = pd.DataFrame({
                         'Statistic': ['High', 'Low', 'Average', 'Std Dev', 'Min', 'Max'],
                         'Value': [
-                            f"${stock_data['High'].max():.2f}",
-                            f"${stock_data['Low'].min():.2f}",
-                            f"${stock_data['Close'].mean():.2f}",
-                            f"${stock_data['Close'].std():.2f}",
-                            f"${stock_data['Close'].min():.2f}",
-                            f"${stock_data['Close'].max():.2f}"
+                            f"${hmax:.2f}",
+                            f"${lmin:.2f}",
+                            f"${cmean:.2f}",
+                            f"${cstd:.2f}",
+                            f"${cmin:.2f}",
+                            f"${cmax:.2f}"
                         ]
                     })
                     
@@ -290,15 +463,23 @@ def main():
         }
         
         portfolio_df = pd.DataFrame(portfolio_data)
-        portfolio_df['Market Value'] = portfolio_df['Shares'] * portfolio_df['Current Price']
-        portfolio_df['Cost Basis'] = portfolio_df['Shares'] * portfolio_df['Purchase Price']
-        portfolio_df['Gain/Loss'] = portfolio_df['Market Value'] - portfolio_df['Cost Basis']
-        portfolio_df['Gain/Loss %'] = (portfolio_df['Gain/Loss'] / portfolio_df['Cost Basis'] * 100).round(2)
+        
+        # Derive value columns on the raw arrays and attach them in one step
+        shares = portfolio_df['Shares'].to_numpy(dtype=np.float64)
+        market_value = shares * portfolio_df['Current Price'].to_numpy()
+        cost_basis = shares * portfolio_df['Purchase Price'].to_numpy()
+        gain_loss = market_value - cost_basis
+        portfolio_df = portfolio_df.assign(**{
+            'Market Value': market_value,
+            'Cost Basis': cost_basis,
+            'Gain/Loss': gain_loss,
+            'Gain/Loss %': np.round(gain_loss / cost_basis * 100, 2)
+        })
         
         # Display portfolio
         st.dataframe(
-            portfolio_df.style.applymap(
-                lambda x: 'color: green' if isinstance(x, (int, float)) and x > 0 else ('color: red' if isinstance(x, (int, float)) and x < 0 else ''),
+            portfolio_df.style.apply(
+                color_pos_neg,
                 subset=['Gain/Loss', 'Gain/Loss %']
             ),
             use_container_width=True
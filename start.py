@@ -7,7 +7,10 @@ import subprocess
 import time
 import sys
 import logging
+import select
+import signal
 import socket
+import requests
 from dotenv import load_dotenv
 
 # Configure logging
@@ -17,10 +20,37 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Readiness polling for the API server: backoff starts small and is capped, within an overall deadline
+API_READY_TIMEOUT = 15
+API_READY_INITIAL_DELAY = 0.05
+API_READY_MAX_DELAY = 0.5
+
+# Signals that should shut down the children; they run in their own sessions, so a terminal
+# hangup or a service manager's SIGTERM only reaches this process
+SHUTDOWN_SIGNALS = [sig for sig in (getattr(signal, "SIGTERM", None), getattr(signal, "SIGHUP", None)) if sig is not None]
+
+# Child process output goes to log files; nothing reads a pipe, so a full one would block the child
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+
+def open_log_file(name):
+    """Open a child process log file for appending, creating the log directory if needed."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    return open(os.path.join(LOG_DIR, name), "ab")
+
 def is_port_in_use(port):
-    """Check if a port is in use."""
+    """Check if a port is in use by trying to bind it, which sends no traffic to any listener."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        return s.connect_ex(('localhost', port)) == 0
+        if os.name == "nt":
+            # On Windows SO_REUSEADDR would let the probe bind over a live listener
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            # SO_REUSEADDR lets ports in TIME_WAIT count as free, matching how the servers bind
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(('', port))
+        except OSError:
+            return True
+        return False
 
 def find_available_port(start_port, max_attempts=10):
     """Find an available port starting from start_port."""
@@ -47,18 +77,46 @@ def start_api_server():
             api_port = new_port
         
         # Use subprocess to start the API server in a new process
-        api_process = subprocess.Popen(
-            [sys.executable, "orchestrator/main.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env=os.environ.copy()  # Pass updated environment variables
-        )
-        logger.info(f"API server started on port {api_port}.")
+        with open_log_file("api.log") as log_file:
+            api_process = subprocess.Popen(
+                [sys.executable, "orchestrator/main.py"],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=True  # Own process group, so shutdown can signal the whole tree
+                # No env argument: the child inherits os.environ, including the updated API_PORT
+            )
+        logger.info(f"API server started on port {api_port}. Logging to {os.path.join(LOG_DIR, 'api.log')}")
         return api_process, api_port
     except Exception as e:
         logger.error(f"Error starting API server: {e}")
         sys.exit(1)
 
+def wait_for_api_server(api_process, api_port, timeout=API_READY_TIMEOUT):
+    """
+    Wait until the API server answers on its root endpoint.
+    
+    Args:
+        api_process: The API server process
+        api_port: Port the API server listens on
+        timeout: Maximum number of seconds to wait
+        
+    Returns:
+        bool: True if the API server is ready, False if it exited or the deadline passed
+    """
+    deadline = time.monotonic() + timeout
+    delay = API_READY_INITIAL_DELAY
+    while time.monotonic() < deadline:
+        if api_process.poll() is not None:
+            return False
+        try:
+            if requests.get(f"http://localhost:{api_port}/", timeout=0.2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(min(delay, max(0, deadline - time.monotonic())))
+        delay = min(delay * 2, API_READY_MAX_DELAY)
+    return False
+
 def start_streamlit_app():
     """Start the Streamlit app."""
     logger.info("Starting Streamlit app...")
@@ -74,21 +132,104 @@ def start_streamlit_app():
             streamlit_port = new_port
         
         # Use subprocess to start the Streamlit app in a new process
-        streamlit_process = subprocess.Popen(
-            [
-                sys.executable, "-m", "streamlit", "run", "streamlit_app.py",
-                "--server.port", str(streamlit_port)
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env=os.environ.copy()  # Pass updated environment variables
-        )
-        logger.info(f"Streamlit app started on port {streamlit_port}.")
+        with open_log_file("streamlit.log") as log_file:
+            streamlit_process = subprocess.Popen(
+                [
+                    sys.executable, "-m", "streamlit", "run", "streamlit_app.py",
+                    "--server.port", str(streamlit_port)
+                ],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=True  # Own process group, so shutdown can signal the whole tree
+                # No env argument: the child inherits os.environ, including the updated API_PORT
+            )
+        logger.info(f"Streamlit app started on port {streamlit_port}. Logging to {os.path.join(LOG_DIR, 'streamlit.log')}")
         return streamlit_process, streamlit_port
     except Exception as e:
         logger.error(f"Error starting Streamlit app: {e}")
         sys.exit(1)
 
+def stop_process(process):
+    """Terminate a child process and everything it spawned."""
+    if hasattr(os, "killpg"):
+        try:
+            # Started with start_new_session=True, so the process group id is the child's pid
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    else:
+        process.terminate()
+
+def handle_shutdown_signal(signum, frame):
+    """Exit on SIGTERM or SIGHUP, so main() stops the child processes on the way out."""
+    logger.info(f"Received {signal.Signals(signum).name}")
+    raise SystemExit(128 + signum)
+
+def wait_for_first_exit(processes):
+    """
+    Block until one of the processes exits, without waking up periodically.
+    
+    Uses pidfds on Linux, kqueue on macOS/BSD and SIGCHLD on other POSIX systems,
+    falling back to polling elsewhere.
+    
+    Args:
+        processes: Child processes to watch
+        
+    Returns:
+        The process that exited
+    """
+    if hasattr(os, "pidfd_open"):
+        pidfds = {}
+        try:
+            for process in processes:
+                pidfds[os.pidfd_open(process.pid)] = process
+            ready, _, _ = select.select(list(pidfds), [], [])
+            return pidfds[ready[0]]
+        except OSError as e:
+            logger.debug(f"pidfd wait unavailable: {e}")
+        finally:
+            for fd in pidfds:
+                os.close(fd)
+    elif hasattr(select, "kqueue"):
+        kq = select.kqueue()
+        try:
+            events = [
+                select.kevent(process.pid, filter=select.KQ_FILTER_PROC,
+                              flags=select.KQ_EV_ADD, fflags=select.KQ_NOTE_EXIT)
+                for process in processes
+            ]
+            exited_pid = kq.control(events, 1)[0].ident
+            return next(process for process in processes if process.pid == exited_pid)
+        except OSError as e:
+            logger.debug(f"kqueue wait unavailable: {e}")
+        finally:
+            kq.close()
+    
+    if hasattr(signal, "sigwait"):
+        # A blocked SIGCHLD stays pending, so an exit between poll() and sigwait() still wakes us.
+        # Shutdown signals are waited for too, since their handlers never run while we sit in sigwait()
+        wait_signals = {signal.SIGCHLD, signal.SIGINT, *SHUTDOWN_SIGNALS}
+        signal.pthread_sigmask(signal.SIG_BLOCK, wait_signals)
+        try:
+            while True:
+                for process in processes:
+                    if process.poll() is not None:
+                        return process
+                signum = signal.sigwait(wait_signals)
+                if signum == signal.SIGINT:
+                    raise KeyboardInterrupt
+                if signum != signal.SIGCHLD:
+                    handle_shutdown_signal(signum, None)
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, wait_signals)
+    
+    # Fallback: poll the processes once per second
+    while True:
+        for process in processes:
+            if process.poll() is not None:
+                return process
+        time.sleep(1)
+
 def main():
     """Start all components of the application."""
     logger.info("Starting Finance Assistant application...")
@@ -96,42 +237,51 @@ def main():
     # Start API server
     api_process, api_port = start_api_server()
     
-    # Wait for API server to initialize (adjust time as needed)
-    logger.info("Waiting for API server to initialize...")
-    time.sleep(5)
-    
-    # Update the API URL environment variable for Streamlit
-    os.environ["API_HOST"] = "localhost"
-    os.environ["API_PORT"] = str(api_port)
-    
-    # Start Streamlit app
-    streamlit_process, streamlit_port = start_streamlit_app()
+    streamlit_process = None
     
-    logger.info("All components started successfully.")
-    logger.info(f"API server running on http://localhost:{api_port}")
-    logger.info(f"Streamlit app running on http://localhost:{streamlit_port}")
-    logger.info("Press Ctrl+C to stop all processes.")
+    for signum in SHUTDOWN_SIGNALS:
+        signal.signal(signum, handle_shutdown_signal)
     
     try:
-        # Keep the script running
-        while True:
-            # Check if processes are still running
-            if api_process.poll() is not None:
-                logger.error("API server has stopped unexpectedly.")
-                streamlit_process.terminate()
-                sys.exit(1)
-            
-            if streamlit_process.poll() is not None:
-                logger.error("Streamlit app has stopped unexpectedly.")
-                api_process.terminate()
-                sys.exit(1)
-                
-            time.sleep(1)
+        # Update the API URL environment variable for Streamlit
+        os.environ["API_HOST"] = "localhost"
+        os.environ["API_PORT"] = str(api_port)
+        
+        # Start Streamlit app right away; it boots while the API server initializes
+        streamlit_process, streamlit_port = start_streamlit_app()
+        
+        # Wait for API server to answer requests
+        logger.info("Waiting for API server to initialize...")
+        if wait_for_api_server(api_process, api_port):
+            logger.info("API server is ready.")
+        elif api_process.poll() is not None:
+            logger.error("API server exited during startup.")
+            sys.exit(1)
+        else:
+            logger.warning(f"API server not ready after {API_READY_TIMEOUT}s; continuing anyway.")
+        
+        logger.info("All components started successfully.")
+        logger.info(f"API server running on http://localhost:{api_port}")
+        logger.info(f"Streamlit app running on http://localhost:{streamlit_port}")
+        logger.info("Press Ctrl+C to stop all processes.")
+        
+        # Keep the script running until either process exits
+        exited_process = wait_for_first_exit([api_process, streamlit_process])
+        exited_process.poll()
+        if exited_process is api_process:
+            logger.error("API server has stopped unexpectedly.")
+        else:
+            logger.error("Streamlit app has stopped unexpectedly.")
+        sys.exit(1)
     except KeyboardInterrupt:
-        # Handle Ctrl+C
+        # Handle Ctrl+C; the children run in their own sessions, so only this process received it
+        pass
+    finally:
+        # However supervision ends, take both children down with it
         logger.info("Stopping all processes...")
-        api_process.terminate()
-        streamlit_process.terminate()
+        stop_process(api_process)
+        if streamlit_process is not None:
+            stop_process(streamlit_process)
         logger.info("All processes stopped.")
 
 if __name__ == "__main__":
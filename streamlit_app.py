@@ -4,23 +4,22 @@ This app provides a voice interface for financial data and analysis.
 """
 import os
 import logging
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import streamlit as st
 from dotenv import load_dotenv
 import pandas as pd
 import numpy as np
 import datetime
-import time
-import json
-import base64
-from io import BytesIO
-import gtts
 import yfinance as yf
-from alpha_vantage.timeseries import TimeSeries
-from alpha_vantage.fundamentaldata import FundamentalData
 import requests
 
 # Import our custom VoiceAgent
 from agents.voice_agent import VoiceAgent
+from streamlit_app.utils import color_pos_neg, get_http_session, latest_closes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +31,59 @@ load_dotenv()
 # Get API keys
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY", "demo")
 
+# Example queries shown on the Voice Assistant page, rendered as one markdown block
+EXAMPLE_QUERIES = (
+    "What's our risk exposure in Asia tech stocks today?",
+    "Highlight any earnings surprises in the technology sector.",
+    "Give me a summary of today's market performance."
+)
+EXAMPLE_QUERIES_MARKDOWN = "### Example Queries:\n" + "\n".join(f"- {query}" for query in EXAMPLE_QUERIES)
+
+# Query keywords compiled into one case-insensitive pattern, so process_query scans the query once
+QUERY_KEYWORD_PATTERN = re.compile(
+    r"(?P<asia>asia)|(?P<tech>tech)|(?P<earnings>earnings|surprises)|(?P<market>market|overview)",
+    re.IGNORECASE
+)
+
+# Conversation messages kept (and shown) on the Voice Assistant page; older ones are dropped
+CONVERSATION_HISTORY_MAX_MESSAGES = 40
+
+# Answers are reused per session for as long as the market data behind them is cached
+QUERY_CACHE_TTL_SECONDS = 60
+QUERY_CACHE_MAX_SIZE = 128
+
+# Fixed replies from process_query; their speech is synthesized once and served from the TTS cache
+EARNINGS_UNAVAILABLE_RESPONSE = "I couldn't retrieve the latest earnings data. Please try again later."
+MARKET_UNAVAILABLE_RESPONSE = "I couldn't retrieve the latest market data. Please try again later."
+DEFAULT_RESPONSE_TEMPLATE = (
+    "I understand you're asking about: {query}\n\nTo get specific financial information, try asking about market overview, "
+    "portfolio exposure (especially in regions like Asia or sectors like Technology), or recent earnings surprises."
+)
+DATA_ERROR_RESPONSE = "I'm having trouble processing your query due to a data access issue. Please try again later or ask a different question."
+FIXED_RESPONSES = frozenset({EARNINGS_UNAVAILABLE_RESPONSE, MARKET_UNAVAILABLE_RESPONSE, DATA_ERROR_RESPONSE})
+
+# Page styles, built once; Streamlit drops elements a rerun does not emit, so this is still sent on every run
+CUSTOM_CSS = """
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        color: #1E88E5;
+        text-align: center;
+        margin-bottom: 1rem;
+    }
+    .sub-header {
+        font-size: 1.5rem;
+        color: #0D47A1;
+        margin-top: 2rem;
+        margin-bottom: 1rem;
+    }
+    .info-text {
+        color: #555;
+        font-size: 0.9rem;
+    }
+</style>
+"""
+
 # App title and configuration
 st.set_page_config(
     page_title="Voice Finance Assistant",
@@ -39,24 +91,31 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize voice agent
-voice_agent = VoiceAgent()
+# Initialize voice agent once per process; the script itself re-executes on every rerun
+@st.cache_resource
+def get_voice_agent():
+    """Get the shared VoiceAgent, warming its audio pipeline in the background."""
+    agent = VoiceAgent()
+    threading.Thread(target=agent.warmup, name="voice-warmup", daemon=True).start()
+    return agent
 
-# Initialize API clients
-alpha_ts = TimeSeries(key=ALPHA_VANTAGE_API_KEY, output_format='pandas')
-alpha_fd = FundamentalData(key=ALPHA_VANTAGE_API_KEY, output_format='pandas')
+voice_agent = get_voice_agent()
 
 # Initialize session state
 if 'audio_bytes' not in st.session_state:
     st.session_state.audio_bytes = None
+if 'pending_speech' not in st.session_state:
+    st.session_state.pending_speech = None
 if 'voice_response' not in st.session_state:
     st.session_state.voice_response = None
 if 'conversation_history' not in st.session_state:
-    st.session_state.conversation_history = []
+    st.session_state.conversation_history = deque(maxlen=CONVERSATION_HISTORY_MAX_MESSAGES)
 if 'last_query' not in st.session_state:
     st.session_state.last_query = ""
 if 'last_response' not in st.session_state:
     st.session_state.last_response = ""
+if 'query_cache' not in st.session_state:
+    st.session_state.query_cache = {}
 if 'market_data' not in st.session_state:
     st.session_state.market_data = None
 if 'portfolio_data' not in st.session_state:
@@ -70,70 +129,43 @@ if 'portfolio_data' not in st.session_state:
     ])
 
 # Apply custom CSS
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #1E88E5;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .sub-header {
-        font-size: 1.5rem;
-        color: #0D47A1;
-        margin-top: 2rem;
-        margin-bottom: 1rem;
-    }
-    .card {
-        border-radius: 5px;
-        padding: 1rem;
-        margin-bottom: 1rem;
-        background-color: #f8f9fa;
-        border-left: 4px solid #1E88E5;
-    }
-    .info-text {
-        color: #555;
-        font-size: 0.9rem;
-    }
-    .highlight {
-        background-color: #e3f2fd;
-        padding: 0.2rem;
-        border-radius: 3px;
-    }
-    .voice-button {
-        background-color: #1E88E5;
-        color: white;
-        border-radius: 50%;
-        width: 100px;
-        height: 100px;
-        font-size: 1.5rem;
-        margin: 1rem auto;
-        display: block;
-    }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-    }
-    .user-message {
-        background-color: #e8eaf6;
-        border-left: 4px solid #3f51b5;
-    }
-    .assistant-message {
-        background-color: #f3e5f5;
-        border-left: 4px solid #9c27b0;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+def _synthesize(text):
+    """Synthesize speech for text, raising on failure so st.cache_data does not cache it."""
+    audio_bytes = voice_agent.text_to_speech(text)
+    if audio_bytes is None:
+        raise RuntimeError("Text-to-speech conversion failed")
+    return audio_bytes
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def synthesize_speech(text):
+    """Synthesize speech for a reply, cached in memory across reruns and sessions."""
+    return _synthesize(text)
+
+@st.cache_data(persist="disk", show_spinner=False)
+def synthesize_fixed_speech(text):
+    """
+    Synthesize speech for one of FIXED_RESPONSES, persisted to disk across restarts.
+    
+    Streamlit never evicts persisted entries, so only the fixed replies go here.
+    """
+    return _synthesize(text)
 
 def text_to_speech(text):
     """Convert text to speech and return audio bytes."""
-    return voice_agent.text_to_speech(text)
+    try:
+        if text in FIXED_RESPONSES:
+            return synthesize_fixed_speech(text)
+        return synthesize_speech(text)
+    except RuntimeError:
+        return None
 
 def process_audio_file(audio_file):
     """Process an uploaded audio file and convert to text."""
     return voice_agent.speech_to_text(audio_file)
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_market_data():
     """Get real-time market data for major indices."""
     try:
@@ -147,16 +179,26 @@ def get_market_data():
             "^FTSE": "FTSE 100"
         }
         
-        # Get data for each index
+        # Get two days of closes for all indices in one batched download
+        history = yf.download(
+            tickers=" ".join(indices),
+            period="2d",
+            group_by="ticker",
+            auto_adjust=True,
+            threads=True,
+            progress=False
+        )
+        multi_ticker = isinstance(history.columns, pd.MultiIndex)
+        
         data = []
         for symbol, name in indices.items():
-            index = yf.Ticker(symbol)
-            info = index.info
-            history = index.history(period="2d")
+            if multi_ticker and symbol not in history.columns.get_level_values(0):
+                continue
+            closes = (history[symbol] if multi_ticker else history)['Close'].dropna()
             
-            if not history.empty:
-                current_price = history['Close'].iloc[-1]
-                prev_price = history['Close'].iloc[-2] if len(history) > 1 else current_price
+            if not closes.empty:
+                current_price = closes.iloc[-1]
+                prev_price = closes.iloc[-2] if len(closes) > 1 else current_price
                 change = current_price - prev_price
                 change_pct = (change / prev_price) * 100 if prev_price != 0 else 0
                 
@@ -175,35 +217,40 @@ def get_market_data():
             {"Index": "Data temporarily unavailable", "Price": 0, "Change": 0, "Change %": 0}
         ])
 
+@st.cache_data(ttl=60, show_spinner=False)
+def get_latest_prices(symbols):
+    """Get the latest close for each symbol from one batched download."""
+    history = yf.download(
+        tickers=" ".join(symbols),
+        period="5d",
+        auto_adjust=True,
+        threads=True,
+        progress=False
+    )
+    return latest_closes(history, symbols)
+
 def get_portfolio_data():
     """Get real-time data for portfolio holdings."""
     try:
         # Get the base portfolio with share counts
         portfolio = st.session_state.portfolio_data.copy()
         
-        # Get current prices and calculate values
-        for i, row in portfolio.iterrows():
-            symbol = row['Symbol']
-            shares = row['Shares']
-            
-            try:
-                stock = yf.Ticker(symbol)
-                current_price = stock.info.get('regularMarketPrice', 0)
-                if current_price is None:
-                    current_price = stock.history(period="1d")['Close'].iloc[-1]
-                
-                portfolio.at[i, 'Price'] = current_price
-                portfolio.at[i, 'Value'] = current_price * shares
-            except Exception as e:
-                logger.error(f"Error fetching data for {symbol}: {e}")
-                portfolio.at[i, 'Price'] = 0
-                portfolio.at[i, 'Value'] = 0
+        # Get current prices for all holdings at once; symbols without data are valued at 0
+        prices = get_latest_prices(tuple(portfolio['Symbol']))
+        missing = portfolio['Symbol'][~portfolio['Symbol'].isin(prices.dropna().index)]
+        if not missing.empty:
+            logger.error(f"Error fetching data for {', '.join(missing)}")
+        
+        portfolio['Price'] = portfolio['Symbol'].map(prices).fillna(0)
+        portfolio['Value'] = portfolio['Price'] * portfolio['Shares']
         
         return portfolio
     except Exception as e:
         logger.error(f"Error processing portfolio data: {e}")
-        return st.session_state.portfolio_data
+        # Keep the Price and Value columns the portfolio pages expect, valued at 0
+        return st.session_state.portfolio_data.assign(Price=0.0, Value=0.0)
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def get_earnings_surprises(days=30):
     """Get real earnings surprises data."""
     try:
@@ -216,7 +263,8 @@ def get_earnings_surprises(days=30):
             try:
                 # Get earnings data
                 url = f"https://www.alphavantage.co/query?function=EARNINGS&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
-                r = requests.get(url)
+                # Bounded so a slow upstream cannot hold the page render indefinitely
+                r = get_http_session().get(url, timeout=10)
                 data = r.json()
                 
                 if 'quarterlyEarnings' in data and data['quarterlyEarnings']:
@@ -258,6 +306,24 @@ def get_earnings_surprises(days=30):
         return pd.DataFrame()
 
 def process_query(query):
+    """Process a text query, reusing this session's recent answer to the same query."""
+    now = time.monotonic()
+    cached = st.session_state.query_cache.get(query)
+    if cached is not None and now - cached[0] < QUERY_CACHE_TTL_SECONDS:
+        return cached[1]
+    
+    response = build_query_response(query)
+    
+    # Fallback replies are not cached, so the next attempt retries the data sources
+    if response not in (EARNINGS_UNAVAILABLE_RESPONSE, MARKET_UNAVAILABLE_RESPONSE, DATA_ERROR_RESPONSE):
+        query_cache = st.session_state.query_cache
+        query_cache.pop(query, None)
+        query_cache[query] = (now, response)
+        if len(query_cache) > QUERY_CACHE_MAX_SIZE:
+            del query_cache[next(iter(query_cache))]
+    return response
+
+def build_query_response(query):
     """Process a text query and return a response with real data."""
     try:
         # Get real-time portfolio data
@@ -277,7 +343,8 @@ def process_query(query):
         market_data = get_market_data()
         
         # Process the query based on real data
-        if "asia" in query.lower() and "tech" in query.lower():
+        keywords = {match.lastgroup for match in QUERY_KEYWORD_PATTERN.finditer(query)}
+        if "asia" in keywords and "tech" in keywords:
             # Format the top holdings for the response
             top_holdings = ""
             for _, row in asia_tech.sort_values('Value', ascending=False).head(3).iterrows():
@@ -285,22 +352,22 @@ def process_query(query):
             
             return f"Your Asia tech allocation is currently {asia_tech_pct:.1f}% of your total portfolio value. Top holdings in this segment include {top_holdings[:-2]}."
         
-        elif "earnings" in query.lower() or "surprises" in query.lower():
+        elif "earnings" in keywords:
             if not earnings_data.empty:
                 # Calculate percentage of companies that beat expectations
                 beat_count = len(earnings_data[earnings_data['Surprise %'] > 0])
                 total_count = len(earnings_data)
                 beat_pct = (beat_count / total_count * 100) if total_count > 0 else 0
                 
-                # Get top positive and negative surprises
-                top_positive = earnings_data.sort_values('Surprise %', ascending=False).iloc[0]
-                top_negative = earnings_data.sort_values('Surprise %').iloc[0]
+                # Get top positive and negative surprises in one pass each, without sorting
+                top_positive = earnings_data.loc[earnings_data['Surprise %'].idxmax()]
+                top_negative = earnings_data.loc[earnings_data['Surprise %'].idxmin()]
                 
                 return f"{beat_pct:.0f}% of companies beat earnings expectations. {top_positive['Company']} beat estimates by {top_positive['Surprise %']:.1f}%, while {top_negative['Company']} missed estimates by {abs(top_negative['Surprise %']):.1f}%."
             else:
-                return "I couldn't retrieve the latest earnings data. Please try again later."
+                return EARNINGS_UNAVAILABLE_RESPONSE
         
-        elif "market" in query.lower() or "overview" in query.lower():
+        elif "market" in keywords:
             if not market_data.empty and market_data['Index'].iloc[0] != "Data temporarily unavailable":
                 # Calculate overall market sentiment
                 positive_indices = len(market_data[market_data['Change %'] > 0])
@@ -316,12 +383,12 @@ def process_query(query):
                 
                 return f"Overall market sentiment today is {sentiment}. The S&P 500 is {['down', 'up'][sp500['Change'] > 0]} {abs(sp500['Change %']):.1f}%, the Dow Jones is {['down', 'up'][dow['Change'] > 0]} {abs(dow['Change %']):.1f}%, and the NASDAQ is {['down', 'up'][nasdaq['Change'] > 0]} {abs(nasdaq['Change %']):.1f}%."
             else:
-                return "I couldn't retrieve the latest market data. Please try again later."
+                return MARKET_UNAVAILABLE_RESPONSE
         else:
-            return f"I understand you're asking about: {query}\n\nTo get specific financial information, try asking about market overview, portfolio exposure (especially in regions like Asia or sectors like Technology), or recent earnings surprises."
+            return DEFAULT_RESPONSE_TEMPLATE.format(query=query)
     except Exception as e:
         logger.error(f"Error processing query: {e}")
-        return f"I'm having trouble processing your query due to a data access issue. Please try again later or ask a different question."
+        return DATA_ERROR_RESPONSE
 
 def main():
     """Main function to run the Streamlit app."""
@@ -340,10 +407,7 @@ def main():
         st.markdown("<h2 class='sub-header'>Voice Assistant</h2>", unsafe_allow_html=True)
         
         # Example queries
-        st.markdown("### Example Queries:")
-        st.markdown("- What's our risk exposure in Asia tech stocks today?")
-        st.markdown("- Highlight any earnings surprises in the technology sector.")
-        st.markdown("- Give me a summary of today's market performance.")
+        st.markdown(EXAMPLE_QUERIES_MARKDOWN)
         
         # Voice input
         col1, col2 = st.columns([3, 1])
@@ -366,8 +430,9 @@ def main():
                     st.session_state.conversation_history.append({"role": "user", "content": st.session_state.last_query})
                     st.session_state.conversation_history.append({"role": "assistant", "content": response})
                     
-                    # Generate audio response
-                    st.session_state.audio_bytes = text_to_speech(response)
+                    # Speech is synthesized after the page has rendered
+                    st.session_state.audio_bytes = None
+                    st.session_state.pending_speech = response
             
             # Audio file upload option
             st.markdown("### Or upload an audio file:")
@@ -375,11 +440,13 @@ def main():
             
             if uploaded_file is not None:
                 with st.spinner("Processing audio file..."):
-                    # Save the uploaded file
-                    audio_bytes = uploaded_file.read()
-                    
-                    # Process the audio file
-                    query = process_audio_file(audio_bytes)
+                    # Transcribe in the background while the market and earnings data process_query
+                    # needs are fetched into the cache; the voice agent decodes file-like objects directly
+                    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt") as executor:
+                        transcription = executor.submit(process_audio_file, uploaded_file)
+                        get_market_data()
+                        get_earnings_surprises()
+                        query = transcription.result()
                     
                     if query:
                         st.session_state.last_query = query
@@ -393,15 +460,18 @@ def main():
                         st.session_state.conversation_history.append({"role": "user", "content": query})
                         st.session_state.conversation_history.append({"role": "assistant", "content": response})
                         
-                        # Generate audio response
-                        st.session_state.audio_bytes = text_to_speech(response)
+                        # Speech is synthesized after the page has rendered
+                        st.session_state.audio_bytes = None
+                        st.session_state.pending_speech = response
                     else:
                         st.error("Could not process the audio file. Please try again with a different file.")
         
         with col2:
-            # Text input as an alternative
-            text_query = st.text_input("Or type your query:", key="text_query")
-            if st.button("Submit"):
+            # Text input as an alternative; the form only reruns the script when submitted
+            with st.form("query_form", clear_on_submit=True):
+                text_query = st.text_input("Or type your query:", key="text_query")
+                submitted = st.form_submit_button("Submit")
+            if submitted:
                 if text_query:
                     with st.spinner("Processing..."):
                         st.session_state.last_query = text_query
@@ -414,20 +484,29 @@ def main():
                         st.session_state.conversation_history.append({"role": "user", "content": text_query})
                         st.session_state.conversation_history.append({"role": "assistant", "content": response})
                         
-                        # Generate audio response
-                        st.session_state.audio_bytes = text_to_speech(response)
+                        # Speech is synthesized after the page has rendered
+                        st.session_state.audio_bytes = None
+                        st.session_state.pending_speech = response
         
-        # Display the audio player if audio is available
+        # Display the audio player if audio is available; new replies fill this slot once synthesized
+        audio_placeholder = st.empty()
         if st.session_state.audio_bytes:
-            st.audio(st.session_state.audio_bytes, format="audio/mp3")
+            audio_placeholder.audio(st.session_state.audio_bytes, format="audio/mp3")
         
-        # Display conversation history
+        # Display the conversation history with Streamlit's native chat elements
         st.markdown("### Conversation History:")
         for message in st.session_state.conversation_history:
-            if message["role"] == "user":
-                st.markdown(f"<div class='chat-message user-message'><strong>You:</strong> {message['content']}</div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<div class='chat-message assistant-message'><strong>Assistant:</strong> {message['content']}</div>", unsafe_allow_html=True)
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+        
+        # Synthesize the latest reply last, so its text and the history are already on screen
+        if st.session_state.pending_speech:
+            with audio_placeholder.container():
+                with st.spinner("Generating voice response..."):
+                    st.session_state.audio_bytes = text_to_speech(st.session_state.pending_speech)
+            st.session_state.pending_speech = None
+            if st.session_state.audio_bytes:
+                audio_placeholder.audio(st.session_state.audio_bytes, format="audio/mp3")
     
     elif page == "Market Overview":
         st.markdown("<h2 class='sub-header'>Market Overview</h2>", unsafe_allow_html=True)
@@ -439,8 +518,8 @@ def main():
         
         # Display market data with conditional formatting
         st.dataframe(
-            market_df.style.applymap(
-                lambda x: 'color: green' if isinstance(x, (int, float)) and x > 0 else ('color: red' if isinstance(x, (int, float)) and x < 0 else ''),
+            market_df.style.apply(
+                color_pos_neg,
                 subset=['Change', 'Change %']
             ),
             use_container_width=True
@@ -566,8 +645,8 @@ def main():
         # Display earnings surprises
         if not earnings_df.empty:
             st.dataframe(
-                earnings_df.style.applymap(
-                    lambda x: 'color: green' if isinstance(x, (int, float)) and x > 0 else ('color: red' if isinstance(x, (int, float)) and x < 0 else ''),
+                earnings_df.style.apply(
+                    color_pos_neg,
                     subset=['Surprise %']
                 ),
                 use_container_width=True
@@ -2,15 +2,16 @@
 Streamlit app for the Finance Assistant.
 """
 import os
+import sys
 import logging
-import json
 import base64
-import requests
-from typing import Dict, List, Any, Optional
-from datetime import datetime
 import streamlit as st
 from dotenv import load_dotenv
-import time
+
+# Add parent directory to path to import the shared Streamlit helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit_app.utils import get_http_session
 
 # Load environment variables
 load_dotenv()
@@ -91,7 +92,7 @@ if input_mode == "Text":
             with st.spinner("Processing your query..."):
                 try:
                     # Call the API
-                    response = requests.post(
+                    response = get_http_session().post(
                         f"{API_URL}/text-query",
                         json={
                             "text": query_text,
@@ -131,17 +132,11 @@ else:  # Voice input
         if st.button("Process Audio", type="primary"):
             with st.spinner("Processing your audio..."):
                 try:
-                    # Convert the uploaded file to base64
-                    audio_bytes = uploaded_file.getvalue()
-                    audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-                    
-                    # Call the API
-                    response = requests.post(
-                        f"{API_URL}/voice-query",
-                        json={
-                            "audio_data": audio_b64,
-                            "query_type": query_type_value,
-                            "parameters": {}
+                    # Call the API, sending the raw audio as a multipart upload
+                    response = get_http_session().post(
+                        f"{API_URL}/query/voice/upload",
+                        files={
+                            "audio": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type or "audio/wav")
                         }
                     )
                     
@@ -149,17 +144,18 @@ else:  # Voice input
                         result = response.json()
                         
                         # Display the transcription
-                        st.markdown("### Transcription:")
-                        st.write(result["query"])
+                        if result.get("transcription"):
+                            st.markdown("### Transcription:")
+                            st.write(result["transcription"])
                         
                         # Display the response
                         st.markdown("### Response:")
-                        st.write(result["response"])
+                        st.write(result["text"])
                         
-                        # Play audio response
-                        if result.get("audio_data"):
-                            audio_data = base64.b64decode(result["audio_data"])
-                            st.audio(audio_data, format="audio/wav")
+                        # Play the audio response; the API runs on this host and returns a file path
+                        audio_file_path = result.get("audio_file_path")
+                        if audio_file_path and os.path.exists(audio_file_path):
+                            st.audio(audio_file_path, format="audio/mpeg")
                     else:
                         st.error(f"Error: {response.status_code} - {response.text}")
                 
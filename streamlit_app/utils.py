@@ -0,0 +1,78 @@
+"""
+Helpers shared by the Streamlit apps.
+"""
+import socket
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+import streamlit as st
+
+# urllib3 already sets TCP_NODELAY; keepalive also lets idle pooled connections be probed instead of going stale
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+]
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter whose pooled connections use TCP keepalive.
+    
+    The socket options are passed whenever the pool manager is built, so they
+    survive the adapter rebuilding it.
+    """
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+@st.cache_resource
+def get_http_session():
+    """
+    Get a pooled HTTP session shared across reruns.
+    
+    Only idempotent requests (GET and friends) are retried on 502/503/504; POSTed
+    queries are not, since a retry could run a query twice.
+    """
+    session = requests.Session()
+    adapter = KeepAliveHTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS
+        )
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def color_pos_neg(col):
+    """Color positive values green and negative values red, one whole column at a time."""
+    values = pd.to_numeric(col, errors="coerce").to_numpy()
+    return np.where(values > 0, 'color: green', np.where(values < 0, 'color: red', ''))
+
+def latest_closes(history, symbols):
+    """
+    Get each symbol's latest close from a yf.download result.
+    
+    Args:
+        history: Frame returned by yf.download for the symbols
+        symbols: Symbols that were requested, in order
+        
+    Returns:
+        Series of closes indexed by symbol; empty if the download returned no data
+    """
+    # A failed or fully delisted download comes back as an empty frame without a Close column
+    if history.empty or 'Close' not in history:
+        return pd.Series(dtype=float)
+    
+    closes = history['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(symbols[0])
+    
+    # Markets close on different days, so carry each symbol's last close forward
+    return closes.ffill().iloc[-1]
@@ -108,6 +108,32 @@ def check_market_data():
         logger.error(f"❌ Error checking market data: {e}")
         return False
 
+def check_portfolio_pricing():
+    """Check that portfolio prices are parsed from batched downloads, including empty ones."""
+    try:
+        logger.info("Checking portfolio price parsing...")
+        import pandas as pd
+        from streamlit_app.utils import latest_closes
+        
+        # A failed download comes back as an empty frame without a Close column
+        empty_prices = latest_closes(pd.DataFrame(), ("AAPL", "MSFT"))
+        if not empty_prices.empty:
+            logger.error("❌ An empty download did not produce empty prices")
+            return False
+        
+        # A single-symbol download has flat columns; a missing last close is carried forward
+        history = pd.DataFrame({"Close": [187.5, 189.0, None]})
+        prices = latest_closes(history, ("AAPL",))
+        if prices.get("AAPL") != 189.0:
+            logger.error(f"❌ Unexpected prices from a single-symbol download: {prices.to_dict()}")
+            return False
+        
+        logger.info("✅ Portfolio price parsing handles empty and single-symbol downloads")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error checking portfolio price parsing: {e}")
+        return False
+
 def check_voice_agent():
     """Check if the voice agent is working."""
     try:
@@ -116,11 +142,11 @@ def check_voice_agent():
         
         voice_agent = VoiceAgent()
         
-        # Test text-to-speech
+        # Test text-to-speech the way the orchestrator pre-renders its fallback replies
         test_text = "This is a test of the text to speech system."
-        output_path = voice_agent.text_to_speech(test_text)
+        output_path = voice_agent.text_to_speech_file(test_text)
         
-        if output_path and os.path.exists(output_path):
+        if output_path and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
             logger.info(f"✅ Text-to-speech is working: output saved to {output_path}")
             tts_ok = True
             # Clean up the file
@@ -220,6 +246,9 @@ def main():
     # Check web scraper
     scraper_ok = check_scraper()
     
+    # Check portfolio price parsing
+    pricing_ok = check_portfolio_pricing()
+    
     # Check voice agent
     voice_ok = check_voice_agent()
     
@@ -237,11 +266,12 @@ def main():
     print(f"Environment: {'✅' if environment_ok else '❌'}")
     print(f"Market Data: {'✅' if market_data_ok else '❌'}")
     print(f"Web Scraper: {'✅' if scraper_ok else '❌'}")
+    print(f"Portfolio Pricing: {'✅' if pricing_ok else '❌'}")
     print(f"Voice Agent: {'✅' if voice_ok else '❌'}")
     print(f"API Health: {'✅' if api_ok else '⚠️ Not checked'}")
     
     # Overall result
-    overall = dependencies_ok and environment_ok and market_data_ok and scraper_ok and voice_ok
+    overall = dependencies_ok and environment_ok and market_data_ok and scraper_ok and pricing_ok and voice_ok
     print(f"\nOverall Status: {'✅ PASSED' if overall else '❌ FAILED'}")
     
     if overall: